@@ -0,0 +1,137 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+import gc
+import os
+import sys
+import unittest
+from unittest.mock import MagicMock, patch
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+from app.repository.connect import _ConnectionPool, _db_config_snapshot
+
+
+class TestConnectionPool(unittest.TestCase):
+    def test_close_returns_connection_to_pool(self):
+        # arrange
+        connection = MagicMock()
+        creator = MagicMock(return_value=connection)
+        pool = _ConnectionPool(creator, pool_size=1, max_overflow=0, recycle_seconds=1800)
+
+        # act
+        first = pool.connect()
+        first.close()
+        second = pool.connect()
+
+        # assert
+        creator.assert_called_once_with()
+        connection.rollback.assert_called_once_with()
+        connection.close.assert_not_called()
+        self.assertIs(second._connection, connection)
+
+    def test_proxy_forwards_attributes(self):
+        # arrange
+        connection = MagicMock()
+        pool = _ConnectionPool(MagicMock(return_value=connection), pool_size=1, max_overflow=0, recycle_seconds=1800)
+
+        # act
+        pooled_connection = pool.connect()
+        pooled_connection.cursor()
+        pooled_connection.commit()
+
+        # assert
+        connection.cursor.assert_called_once_with()
+        connection.commit.assert_called_once_with()
+
+    def test_expired_connection_is_replaced(self):
+        # arrange
+        expired_connection = MagicMock()
+        new_connection = MagicMock()
+        creator = MagicMock(side_effect=[expired_connection, new_connection])
+        pool = _ConnectionPool(creator, pool_size=1, max_overflow=0, recycle_seconds=-1)
+
+        # act
+        pool.connect().close()
+        pooled_connection = pool.connect()
+
+        # assert
+        expired_connection.close.assert_called_once_with()
+        self.assertIs(pooled_connection._connection, new_connection)
+
+    def test_connection_failing_reset_is_discarded(self):
+        # arrange
+        broken_connection = MagicMock()
+        broken_connection.rollback.side_effect = Exception('connection lost')
+        new_connection = MagicMock()
+        creator = MagicMock(side_effect=[broken_connection, new_connection])
+        pool = _ConnectionPool(creator, pool_size=1, max_overflow=0, recycle_seconds=1800)
+
+        # act
+        pool.connect().close()
+        pooled_connection = pool.connect()
+
+        # assert
+        broken_connection.close.assert_called_once_with()
+        self.assertIs(pooled_connection._connection, new_connection)
+
+    def test_when_all_connections_are_checked_out_then_raises_timeout_error(self):
+        # arrange
+        pool = _ConnectionPool(MagicMock(), pool_size=1, max_overflow=0, recycle_seconds=1800, timeout_seconds=0.01)
+        checked_out_connection = pool.connect()
+
+        # act
+        with self.assertRaises(TimeoutError):
+            pool.connect()
+
+        # assert
+        checked_out_connection.close()
+        pool.connect()
+
+    def test_leaving_with_block_returns_connection_to_pool(self):
+        # arrange
+        connection = MagicMock()
+        creator = MagicMock(return_value=connection)
+        pool = _ConnectionPool(creator, pool_size=1, max_overflow=0, recycle_seconds=1800, timeout_seconds=0.01)
+
+        # act
+        with pool.connect() as pooled_connection:
+            pooled_connection.cursor()
+        second = pool.connect()
+
+        # assert
+        creator.assert_called_once_with()
+        connection.rollback.assert_called_once_with()
+        self.assertIs(second._connection, connection)
+
+    def test_dropped_connection_is_returned_to_pool(self):
+        # arrange
+        connection = MagicMock()
+        pool = _ConnectionPool(MagicMock(return_value=connection), pool_size=1, max_overflow=0, recycle_seconds=1800,
+                               timeout_seconds=0.01)
+
+        # act
+        pooled_connection = pool.connect()
+        del pooled_connection
+        gc.collect()
+        second = pool.connect()
+
+        # assert
+        self.assertIs(second._connection, connection)
+
+
+class TestDbConfigSnapshot(unittest.TestCase):
+    def tearDown(self):
+        _db_config_snapshot.cache_clear()
+
+    def test_ip_type_name_is_precomputed(self):
+        for use_private_ip, expected in [(True, 'PRIVATE'), (False, 'PUBLIC')]:
+            with self.subTest(use_private_ip=use_private_ip):
+                # arrange
+                _db_config_snapshot.cache_clear()
+                config = MagicMock(graph_db_type='postgres', use_private_ip=use_private_ip)
+
+                # act
+                with patch('app.repository.connect.get_config', return_value=config):
+                    snapshot = _db_config_snapshot()
+
+                # assert
+                self.assertEqual(snapshot.ip_type_name, expected)
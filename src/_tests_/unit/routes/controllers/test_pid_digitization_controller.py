@@ -144,7 +144,7 @@ class TestDetectText(unittest.IsolatedAsyncioTestCase):
             patch("app.routes.controllers.pid_digitization_controller.storage_path_template_builder.build_image_path", build_image_path), \
             patch("app.routes.controllers.pid_digitization_controller.storage_path_template_builder.build_debug_image_path", build_debug_image_path), \
             patch("app.routes.controllers.pid_digitization_controller.storage_path_template_builder.build_output_image_path", build_output_image_path), \
-            patch("app.routes.controllers.pid_digitization_controller.blob_storage_client", blob_storage_client), \
+            patch("app.routes.controllers.pid_digitization_controller.get_blob_storage_client", return_value=blob_storage_client), \
              patch("app.routes.controllers.pid_digitization_controller.config", config):
             result = await detect_text(pid_id, corrected_symbol_detection_results)
 
@@ -168,10 +168,10 @@ class TestDetectText(unittest.IsolatedAsyncioTestCase):
         image_path = '123/images/123.jpg'
         build_image_path = MagicMock(return_value=image_path)
 
-        blob_exists = MagicMock(wraps=mock_blob_exists)
+        blob_storage_client = MagicMock(blob_exists=MagicMock(wraps=mock_blob_exists))
 
         # act
-        with patch("app.routes.controllers.pid_digitization_controller.blob_storage_client.blob_exists", blob_exists), \
+        with patch("app.routes.controllers.pid_digitization_controller.get_blob_storage_client", return_value=blob_storage_client), \
             patch("app.routes.controllers.pid_digitization_controller.storage_path_template_builder.build_image_path", build_image_path):
             with pytest.raises(HTTPException) as e:
                 await detect_text(pid_id, corrected_symbol_detection_results)
@@ -201,10 +201,10 @@ class TestDetectText(unittest.IsolatedAsyncioTestCase):
         image_path = '123/images/123.jpg'
         build_image_path = MagicMock(return_value=image_path)
 
-        blob_exists = MagicMock(wraps=mock_blob_exists)
+        blob_storage_client = MagicMock(blob_exists=MagicMock(wraps=mock_blob_exists))
 
         # act
-        with patch("app.routes.controllers.pid_digitization_controller.blob_storage_client.blob_exists", blob_exists), \
+        with patch("app.routes.controllers.pid_digitization_controller.get_blob_storage_client", return_value=blob_storage_client), \
             patch("app.routes.controllers.pid_digitization_controller.storage_path_template_builder.build_image_path", build_image_path):
             with pytest.raises(HTTPException) as e:
                 await detect_text(pid_id, corrected_symbol_detection_results)
@@ -240,7 +240,7 @@ class TestGraphConstruction(unittest.IsolatedAsyncioTestCase):
         # act
         with patch("app.routes.controllers.pid_digitization_controller.storage_path_template_builder.build_image_path", build_image_path), \
              patch("app.routes.controllers.pid_digitization_controller.storage_path_template_builder.build_inference_job_status_path", build_job_status_path), \
-             patch("app.routes.controllers.pid_digitization_controller.blob_storage_client", blob_storage_client), \
+             patch("app.routes.controllers.pid_digitization_controller.get_blob_storage_client", return_value=blob_storage_client), \
              patch("app.routes.controllers.pid_digitization_controller.config", config), \
              patch("app.routes.controllers.pid_digitization_controller.datetime", dt), \
              patch("app.queue_consumer._queue", queue):
@@ -291,7 +291,7 @@ class TestGraphConstruction(unittest.IsolatedAsyncioTestCase):
         # act
         with patch("app.routes.controllers.pid_digitization_controller.storage_path_template_builder.build_image_path", build_image_path), \
             patch("app.routes.controllers.pid_digitization_controller.storage_path_template_builder.build_inference_job_status_path", build_job_status_path), \
-            patch("app.routes.controllers.pid_digitization_controller.blob_storage_client", blob_storage_client), \
+            patch("app.routes.controllers.pid_digitization_controller.get_blob_storage_client", return_value=blob_storage_client), \
             patch("app.routes.controllers.pid_digitization_controller.config", config), \
             patch("app.routes.controllers.pid_digitization_controller.datetime", dt):
             with pytest.raises(HTTPException) as e:
@@ -328,7 +328,7 @@ class TestGraphConstruction(unittest.IsolatedAsyncioTestCase):
         # act
         with patch("app.routes.controllers.pid_digitization_controller.storage_path_template_builder.build_image_path", build_image_path), \
             patch("app.routes.controllers.pid_digitization_controller.storage_path_template_builder.build_inference_job_status_path", build_job_status_path), \
-            patch("app.routes.controllers.pid_digitization_controller.blob_storage_client", blob_storage_client), \
+            patch("app.routes.controllers.pid_digitization_controller.get_blob_storage_client", return_value=blob_storage_client), \
             patch("app.routes.controllers.pid_digitization_controller.config", config), \
             patch("app.routes.controllers.pid_digitization_controller.datetime", dt):
             with pytest.raises(HTTPException) as e:
@@ -368,7 +368,7 @@ class TestGraphConstruction(unittest.IsolatedAsyncioTestCase):
         # act
         with patch("app.routes.controllers.pid_digitization_controller.storage_path_template_builder.build_image_path", build_image_path), \
              patch("app.routes.controllers.pid_digitization_controller.storage_path_template_builder.build_inference_job_status_path", build_job_status_path), \
-             patch("app.routes.controllers.pid_digitization_controller.blob_storage_client", blob_storage_client), \
+             patch("app.routes.controllers.pid_digitization_controller.get_blob_storage_client", return_value=blob_storage_client), \
              patch("app.routes.controllers.pid_digitization_controller.config", config), \
              patch("app.routes.controllers.pid_digitization_controller.datetime", dt), \
              patch("app.queue_consumer._queue", queue):
@@ -412,7 +412,7 @@ class TestGraphConstruction(unittest.IsolatedAsyncioTestCase):
         # act
         with patch("app.routes.controllers.pid_digitization_controller.storage_path_template_builder.build_image_path", build_image_path), \
              patch("app.routes.controllers.pid_digitization_controller.storage_path_template_builder.build_inference_job_status_path", build_job_status_path), \
-             patch("app.routes.controllers.pid_digitization_controller.blob_storage_client", blob_storage_client), \
+             patch("app.routes.controllers.pid_digitization_controller.get_blob_storage_client", return_value=blob_storage_client), \
              patch("app.routes.controllers.pid_digitization_controller.config", config), \
              patch("app.routes.controllers.pid_digitization_controller.datetime", dt), \
              patch("app.queue_consumer._queue", queue):
@@ -475,7 +475,7 @@ class TestGraphConstruction(unittest.IsolatedAsyncioTestCase):
             patch("app.routes.controllers.pid_digitization_controller.storage_path_template_builder.build_debug_image_path", build_debug_image_path), \
             patch("app.routes.controllers.pid_digitization_controller.storage_path_template_builder.build_inference_job_status_path", build_job_status_path), \
             patch("app.routes.controllers.pid_digitization_controller.storage_path_template_builder.build_inference_response_path", build_response_path), \
-            patch("app.routes.controllers.pid_digitization_controller.blob_storage_client", blob_storage_client), \
+            patch("app.routes.controllers.pid_digitization_controller.get_blob_storage_client", return_value=blob_storage_client), \
             patch("app.routes.controllers.pid_digitization_controller.config", config), \
             patch("app.routes.controllers.pid_digitization_controller.datetime", dt):
             process_line_detection(pid_id, corrected_text_detection_results)
@@ -542,7 +542,7 @@ class TestGraphConstruction(unittest.IsolatedAsyncioTestCase):
             patch("app.routes.controllers.pid_digitization_controller.storage_path_template_builder.build_debug_image_path", build_debug_image_path), \
             patch("app.routes.controllers.pid_digitization_controller.storage_path_template_builder.build_inference_job_status_path", build_job_status_path), \
             patch("app.routes.controllers.pid_digitization_controller.storage_path_template_builder.build_inference_response_path", build_response_path), \
-            patch("app.routes.controllers.pid_digitization_controller.blob_storage_client", blob_storage_client), \
+            patch("app.routes.controllers.pid_digitization_controller.get_blob_storage_client", return_value=blob_storage_client), \
             patch("app.routes.controllers.pid_digitization_controller.config", config), \
             patch("app.routes.controllers.pid_digitization_controller.datetime", dt):
             process_line_detection(pid_id, corrected_text_detection_results)
@@ -605,7 +605,7 @@ class TestGraphConstruction(unittest.IsolatedAsyncioTestCase):
             patch("app.routes.controllers.pid_digitization_controller.storage_path_template_builder.build_debug_image_path", build_debug_image_path), \
             patch("app.routes.controllers.pid_digitization_controller.storage_path_template_builder.build_inference_job_status_path", build_job_status_path), \
             patch("app.routes.controllers.pid_digitization_controller.storage_path_template_builder.build_inference_response_path", build_response_path), \
-            patch("app.routes.controllers.pid_digitization_controller.blob_storage_client", blob_storage_client), \
+            patch("app.routes.controllers.pid_digitization_controller.get_blob_storage_client", return_value=blob_storage_client), \
             patch("app.routes.controllers.pid_digitization_controller.config", config), \
             patch("app.routes.controllers.pid_digitization_controller.datetime", dt):
             process_line_detection(pid_id, corrected_text_detection_results)
@@ -642,7 +642,7 @@ class TestGetInference(unittest.IsolatedAsyncioTestCase):
 
         # act
         with patch("app.routes.controllers.pid_digitization_controller.storage_path_template_builder", storage_path_template_builder), \
-            patch("app.routes.controllers.pid_digitization_controller.blob_storage_client", blob_storage_client):
+            patch("app.routes.controllers.pid_digitization_controller.get_blob_storage_client", return_value=blob_storage_client):
             result = await get_inference_results(inference_result_type, pid_id)
 
         result = [x async for x in result.body_iterator]
@@ -675,7 +675,7 @@ class TestGetInference(unittest.IsolatedAsyncioTestCase):
 
         # act
         with patch("app.routes.controllers.pid_digitization_controller.storage_path_template_builder", storage_path_template_builder), \
-            patch("app.routes.controllers.pid_digitization_controller.blob_storage_client", blob_storage_client):
+            patch("app.routes.controllers.pid_digitization_controller.get_blob_storage_client", return_value=blob_storage_client):
             result = await get_inference_results(inference_result_type, pid_id)
 
         result = [x async for x in result.body_iterator]
@@ -708,7 +708,7 @@ class TestGetInference(unittest.IsolatedAsyncioTestCase):
 
         # act
         with patch("app.routes.controllers.pid_digitization_controller.storage_path_template_builder", storage_path_template_builder), \
-            patch("app.routes.controllers.pid_digitization_controller.blob_storage_client", blob_storage_client):
+            patch("app.routes.controllers.pid_digitization_controller.get_blob_storage_client", return_value=blob_storage_client):
             result = await get_inference_results(inference_result_type, pid_id)
 
         result = [x async for x in result.body_iterator]
@@ -740,7 +740,7 @@ class TestGetInference(unittest.IsolatedAsyncioTestCase):
 
         # act
         with patch("app.routes.controllers.pid_digitization_controller.storage_path_template_builder", storage_path_template_builder), \
-            patch("app.routes.controllers.pid_digitization_controller.blob_storage_client", blob_storage_client):
+            patch("app.routes.controllers.pid_digitization_controller.get_blob_storage_client", return_value=blob_storage_client):
             result = await get_inference_results(inference_result_type, pid_id)
 
         result = [x async for x in result.body_iterator]
@@ -771,7 +771,7 @@ class TestGetInference(unittest.IsolatedAsyncioTestCase):
 
         # act
         with patch("app.routes.controllers.pid_digitization_controller.storage_path_template_builder", storage_path_template_builder), \
-             patch("app.routes.controllers.pid_digitization_controller.blob_storage_client", blob_storage_client):
+             patch("app.routes.controllers.pid_digitization_controller.get_blob_storage_client", return_value=blob_storage_client):
             result = await get_inference_results(inference_result_type, pid_id)
 
         result = [x async for x in result.body_iterator]
@@ -805,7 +805,7 @@ class TestGetInference(unittest.IsolatedAsyncioTestCase):
 
         # act
         with patch("app.routes.controllers.pid_digitization_controller.storage_path_template_builder", storage_path_template_builder), \
-                patch("app.routes.controllers.pid_digitization_controller.blob_storage_client", blob_storage_client):
+                patch("app.routes.controllers.pid_digitization_controller.get_blob_storage_client", return_value=blob_storage_client):
                     result = await get_inference_results(inference_result_type, pid_id)
 
         result = [x async for x in result.body_iterator]
@@ -838,7 +838,7 @@ class TestGetInference(unittest.IsolatedAsyncioTestCase):
 
         # act
         with patch("app.routes.controllers.pid_digitization_controller.storage_path_template_builder", storage_path_template_builder), \
-            patch("app.routes.controllers.pid_digitization_controller.blob_storage_client", blob_storage_client):
+            patch("app.routes.controllers.pid_digitization_controller.get_blob_storage_client", return_value=blob_storage_client):
             with pytest.raises(HTTPException) as e:
                 await get_inference_results(inference_result_type, pid_id)
 
@@ -864,7 +864,7 @@ class TestGetJobStatus(unittest.IsolatedAsyncioTestCase):
 
         # act
         with patch("app.routes.controllers.pid_digitization_controller.storage_path_template_builder", storage_path_template_builder), \
-            patch("app.routes.controllers.pid_digitization_controller.blob_storage_client", blob_storage_client):
+            patch("app.routes.controllers.pid_digitization_controller.get_blob_storage_client", return_value=blob_storage_client):
             result = await get_job_status(pid_id)
 
         # assert
@@ -888,7 +888,7 @@ class TestGetJobStatus(unittest.IsolatedAsyncioTestCase):
 
         # act
         with patch("app.routes.controllers.pid_digitization_controller.storage_path_template_builder", storage_path_template_builder), \
-            patch("app.routes.controllers.pid_digitization_controller.blob_storage_client", blob_storage_client):
+            patch("app.routes.controllers.pid_digitization_controller.get_blob_storage_client", return_value=blob_storage_client):
             with pytest.raises(HTTPException) as e:
                 await get_job_status(pid_id)
 
@@ -918,7 +918,7 @@ class TestGetInferenceImages(unittest.IsolatedAsyncioTestCase):
 
         # act
         with patch("app.routes.controllers.pid_digitization_controller.storage_path_template_builder", storage_path_template_builder), \
-             patch("app.routes.controllers.pid_digitization_controller.blob_storage_client", blob_storage_client):
+             patch("app.routes.controllers.pid_digitization_controller.get_blob_storage_client", return_value=blob_storage_client):
             result = await get_output_inference_images(pid_id, result_type)
 
         # assert
@@ -943,7 +943,7 @@ class TestGetInferenceImages(unittest.IsolatedAsyncioTestCase):
 
         # act
         with patch("app.routes.controllers.pid_digitization_controller.storage_path_template_builder", storage_path_template_builder), \
-             patch("app.routes.controllers.pid_digitization_controller.blob_storage_client", blob_storage_client):
+             patch("app.routes.controllers.pid_digitization_controller.get_blob_storage_client", return_value=blob_storage_client):
             with pytest.raises(HTTPException) as e:
                 await get_output_inference_images(pid_id, result_type)
 
@@ -6,6 +6,7 @@ from unittest.mock import MagicMock, patch
 import sys
 
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', '..', '..'))
+from app.config import Config
 from app.services.graph_construction.graph_service import GraphService
 from app.services.graph_construction.pre_find_symbol_connectivities import pre_find_symbol_connectivities
 from app.services.graph_construction.config.symbol_node_keys_config import SymbolNodeKeysConfig
@@ -97,3 +98,32 @@ class TestPreFindSymbolConnectivitiesComponent(unittest.TestCase):
         assert result.asset_valve_symbol_ids == {'4', '5'}
         assert result.flow_direction_asset_ids == {'6', '7', '10'}
         assert result.asset_symbol_ids == {'4', '5', '6', '7', '10'}
+
+    def test_prefixes_default_to_the_configuration(self):
+        # arrange
+        config = Config(
+            gcs_bucket_name='gcs_bucket_name',
+            symbol_detection_api='symbol_detection_api',
+            symbol_detection_api_bearer_token='symbol_detection_api_bearer_token',
+            arrow_symbol_label='arrow',
+            valve_symbol_prefix='Valve',
+            flow_direction_asset_prefixes='Equip,Connector',
+            symbol_label_prefixes_with_text='Equip/,Connector/,Valve/'
+        )
+
+        graph_service = MagicMock(GraphService)
+        graph_service.get_symbol_nodes.return_value = [
+            ('1', {SymbolNodeKeysConfig.LABEL_KEY: 'arrow', SymbolNodeKeysConfig.TEXT_ASSOCIATED_KEY: 'arrow-1'}),
+            ('2', {SymbolNodeKeysConfig.LABEL_KEY: 'valve/1', SymbolNodeKeysConfig.TEXT_ASSOCIATED_KEY: 'valve-1'}),
+            ('3', {SymbolNodeKeysConfig.LABEL_KEY: 'equip/2', SymbolNodeKeysConfig.TEXT_ASSOCIATED_KEY: 'equip-2'}),
+            ('4', {SymbolNodeKeysConfig.LABEL_KEY: 'sensor/1', SymbolNodeKeysConfig.TEXT_ASSOCIATED_KEY: 'sensor-1'}),
+        ]
+
+        # act
+        with patch('app.services.graph_construction.pre_find_symbol_connectivities.config', config):
+            result = pre_find_symbol_connectivities(graph_service)
+
+        # asserts
+        assert result.asset_valve_symbol_ids == {'2'}
+        assert result.flow_direction_asset_ids == {'3'}
+        assert result.asset_symbol_ids == {'2', '3'}
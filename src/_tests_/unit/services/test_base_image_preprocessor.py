@@ -5,9 +5,10 @@ import os
 import sys
 import numpy as np
 import unittest
+from unittest.mock import patch
 
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
-from app.services.base_image_preprocessor import to_binary, to_grayscale
+from app.services.base_image_preprocessor import apply_clahe, to_binary, to_grayscale
 
 input_data_path = os.path.join(os.path.dirname(__file__), 'data', 'input')
 
@@ -31,3 +32,16 @@ class TestBaseImagePreprocessor(unittest.TestCase):
 
         # Assert that the processed image is binary (only black or white pixels)
         self.assertTrue(np.all(np.logical_or(binarized_image == 0, binarized_image == 255)))
+
+    def test_apply_clahe_on_cpu(self):
+        # arrange
+        image = np.random.default_rng(0).integers(0, 256, (64, 64), dtype=np.uint8)
+        expected_image = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8)).apply(image)
+
+        # act
+        with patch('app.services.base_image_preprocessor.is_cuda_available', return_value=False):
+            result = apply_clahe(image)
+
+        # assert
+        self.assertIs(result, image)
+        self.assertTrue(np.array_equal(result, expected_image))
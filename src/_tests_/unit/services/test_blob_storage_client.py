@@ -1,123 +1,454 @@
 # Copyright (c) Microsoft Corporation.
 # Licensed under the MIT license.
+from datetime import datetime, timedelta
+import io
 import os
 import unittest
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, patch
 import sys
+from google.api_core.exceptions import NotFound
+from google.auth.credentials import AnonymousCredentials
 
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
-from app.services.blob_storage_client import BlobStorageClient
+from app.services.blob_storage_client import (
+    BlobStorageClient,
+    CREDENTIALS_REFRESH_MAX_FAILURES,
+    CREDENTIALS_REFRESH_RETRY_SECONDS,
+    UNCHANGED_UPLOAD_CHECK_MIN_BYTES,
+    _crc32c_base64,
+    get_blob_storage_client)
+
+
+def _create_initialized_gcs_client():
+    blob = MagicMock()
+    bucket = MagicMock()
+    bucket.blob.return_value = blob
+    blob_storage_client = BlobStorageClient(MagicMock(), MagicMock())
+    blob_storage_client._bucket = bucket
+    blob_storage_client._client = MagicMock()
+    return blob_storage_client, bucket, blob
+
+
+class TestGcsUploadBytes(unittest.TestCase):
+    def test_happy_path(self):
+        # arrange
+        blob_storage_client, bucket, blob = _create_initialized_gcs_client()
 
+        # act
+        result = blob_storage_client.upload_bytes('blob-name.json', 'text')
 
-class TestUploadBytes(unittest.IsolatedAsyncioTestCase):
-    async def test_happy_path(self):
+        # assert
+        bucket.blob.assert_called_once_with('blob-name.json')
+        blob.upload_from_file.assert_called_once()
+        file_obj = blob.upload_from_file.call_args[0][0]
+        kwargs = blob.upload_from_file.call_args[1]
+        self.assertEqual(file_obj.getvalue(), b'text')
+        self.assertEqual(kwargs['size'], 4)
+        self.assertEqual(kwargs['content_type'], 'application/json')
+        self.assertEqual(kwargs['checksum'], 'crc32c')
+        self.assertEqual(blob.chunk_size, 8 * 1024 * 1024)
+        self.assertIs(result, blob)
+        blob.reload.assert_not_called()
+
+    def test_small_binary_content_is_uploaded_without_checking_existing_content(self):
         # arrange
-        async def mock_upload_blob(*args, **kwargs):
-            return {'uploaded': True}
+        blob_storage_client, _, blob = _create_initialized_gcs_client()
+        blob.crc32c = _crc32c_base64(b'bytes')
 
-        blob_name = 'blob-name'
-        bytes = b'bytes'
+        # act
+        blob_storage_client.upload_bytes('blob-name', b'bytes')
 
-        blob_client = MagicMock()
-        blob_client.upload_blob = MagicMock(wraps=mock_upload_blob)
+        # assert
+        blob.reload.assert_not_called()
+        blob.upload_from_file.assert_called_once()
 
-        container_client = MagicMock()
-        container_client.get_blob_client.return_value = blob_client
-        blob_storage_client = BlobStorageClient(MagicMock(), MagicMock())
-        blob_storage_client._container_client = container_client
+    def test_unchanged_content_is_not_uploaded(self):
+        # arrange
+        blob_storage_client, _, blob = _create_initialized_gcs_client()
+        data = b'0' * UNCHANGED_UPLOAD_CHECK_MIN_BYTES
+        blob.crc32c = _crc32c_base64(data)
+
+        # act
+        blob_storage_client.upload_bytes('blob-name', data)
+
+        # assert
+        blob.upload_from_file.assert_not_called()
+
+    def test_changed_content_is_uploaded(self):
+        # arrange
+        blob_storage_client, _, blob = _create_initialized_gcs_client()
+        blob.crc32c = _crc32c_base64(b'previous bytes')
 
         # act
-        await blob_storage_client.upload_bytes(blob_name, bytes)
+        blob_storage_client.upload_bytes('blob-name.png', b'0' * UNCHANGED_UPLOAD_CHECK_MIN_BYTES)
 
         # assert
-        container_client.get_blob_client.assert_called_once_with(blob_name)
-        blob_client.upload_blob.assert_called_once_with(bytes, overwrite=True)
+        blob.upload_from_file.assert_called_once()
+        self.assertEqual(blob.upload_from_file.call_args[1]['content_type'], 'image/png')
 
-    async def test_blob_client_not_exists_throws_exception(self):
+    def test_given_content_type_is_used(self):
+        # arrange
+        blob_storage_client, _, blob = _create_initialized_gcs_client()
+
+        # act
+        blob_storage_client.upload_bytes('blob-name.webp', b'bytes', content_type='image/webp')
+
+        # assert
+        self.assertEqual(blob.upload_from_file.call_args[1]['content_type'], 'image/webp')
+
+    def test_not_initialized_throws_exception(self):
         # arrange
         blob_storage_client = BlobStorageClient(MagicMock(), MagicMock())
 
         # act
         with self.assertRaises(Exception) as e:
-            await blob_storage_client.upload_bytes('blob-name', b'bytes')
+            blob_storage_client.upload_bytes('blob-name', b'bytes')
 
         # assert
         self.assertEqual(str(e.exception), 'Blob storage client is not initialized')
 
 
-class TestDownloadBytes(unittest.IsolatedAsyncioTestCase):
-    async def test_happy_path(self):
+class TestGcsDeleteBlob(unittest.TestCase):
+    def test_happy_path(self):
         # arrange
-        async def mock_readall(*args, **kwargs):
-            return b'bytes'
+        blob_storage_client, bucket, blob = _create_initialized_gcs_client()
+        blob.exists.return_value = True
+        blob_storage_client.blob_exists('blob-name')
 
-        def mock_download_blob(*args, **kwargs):
-            blob = MagicMock()
-            blob.readall = MagicMock(wraps=mock_readall)
-            return blob
+        # act
+        blob_storage_client.delete_blob('blob-name')
+        blob_storage_client.blob_exists('blob-name')
 
-        blob_name = 'blob-name'
+        # assert
+        blob.delete.assert_called_once_with(client=blob_storage_client._client)
+        self.assertEqual(blob.exists.call_count, 2)
 
-        blob_client = MagicMock()
-        blob_client.download_blob = MagicMock(wraps=mock_download_blob)
+    def test_missing_blob_is_ignored(self):
+        # arrange
+        blob_storage_client, _, blob = _create_initialized_gcs_client()
+        blob.delete.side_effect = NotFound('missing')
 
-        container_client = MagicMock()
-        container_client.get_blob_client.return_value = blob_client
-        blob_storage_client = BlobStorageClient(MagicMock(), MagicMock())
-        blob_storage_client._container_client = container_client
+        # act
+        blob_storage_client.delete_blob('blob-name')
+
+        # assert
+        blob.delete.assert_called_once()
+
+
+class TestGcsDownloadBytes(unittest.TestCase):
+    def test_happy_path_does_not_check_existence(self):
+        # arrange
+        blob_storage_client, bucket, blob = _create_initialized_gcs_client()
+        blob.download_to_file.side_effect = lambda destination, **kwargs: destination.write(b'bytes')
 
         # act
-        result = await blob_storage_client.download_bytes(blob_name)
+        result = blob_storage_client.download_bytes('blob-name')
 
         # assert
-        container_client.get_blob_client.assert_called_once_with(blob_name)
-        blob_client.download_blob.assert_called_once_with()
+        bucket.blob.assert_called_once_with('blob-name')
+        blob.exists.assert_not_called()
         self.assertEqual(result, b'bytes')
 
-    async def test_blob_client_not_exists_throws_exception(self):
+    def test_missing_blob_raises_file_not_found(self):
+        # arrange
+        blob_storage_client, _, blob = _create_initialized_gcs_client()
+        blob.download_to_file.side_effect = NotFound('missing')
+
+        # act
+        with self.assertRaises(FileNotFoundError):
+            blob_storage_client.download_bytes('blob-name')
+
+    def test_not_initialized_throws_exception(self):
         # arrange
         blob_storage_client = BlobStorageClient(MagicMock(), MagicMock())
 
         # act
         with self.assertRaises(Exception) as e:
-            await blob_storage_client.download_bytes('blob-name')
+            blob_storage_client.download_bytes('blob-name')
 
         # assert
         self.assertEqual(str(e.exception), 'Blob storage client is not initialized')
 
 
-class TestBlobExists(unittest.IsolatedAsyncioTestCase):
-    async def test_happy_path(self):
+class TestGcsDownloadTo(unittest.TestCase):
+    def test_happy_path(self):
         # arrange
-        async def mock_exists(*args, **kwargs):
-            return True
+        blob_storage_client, _, blob = _create_initialized_gcs_client()
+        destination = io.BytesIO()
 
-        blob_name = 'blob-name'
+        # act
+        blob_storage_client.download_to('blob-name', destination)
 
-        blob_client = MagicMock()
-        blob_client.exists = MagicMock(wraps=mock_exists)
+        # assert
+        blob.download_to_file.assert_called_once_with(destination, client=blob_storage_client._client)
 
-        container_client = MagicMock()
-        container_client.get_blob_client.return_value = blob_client
-        blob_storage_client = BlobStorageClient(MagicMock(), MagicMock())
-        blob_storage_client._container_client = container_client
+
+class TestGcsDownloadMany(unittest.TestCase):
+    def test_happy_path(self):
+        # arrange
+        blob_storage_client, bucket, _ = _create_initialized_gcs_client()
+        blob_storage_client._config.workers_count_for_data_batch = 2
+        blobs = {}
+
+        def create_blob(blob_name):
+            blob = MagicMock()
+            blob.download_to_file.side_effect = lambda destination, **kwargs: destination.write(blob_name.encode())
+            blobs[blob_name] = blob
+            return blob
+
+        bucket.blob.side_effect = create_blob
+
+        # act
+        result = blob_storage_client.download_many(['a', 'b', 'a', 'c'])
+
+        # assert
+        self.assertEqual(result, {'a': b'a', 'b': b'b', 'c': b'c'})
+        self.assertEqual(bucket.blob.call_count, 3)
+
+    def test_missing_blob_raises_file_not_found(self):
+        # arrange
+        blob_storage_client, _, blob = _create_initialized_gcs_client()
+        blob_storage_client._config.workers_count_for_data_batch = 2
+        blob.download_to_file.side_effect = NotFound('missing')
+
+        # act
+        with self.assertRaises(FileNotFoundError):
+            blob_storage_client.download_many(['a', 'b'])
+
+
+class TestGcsBlobExists(unittest.TestCase):
+    def test_existing_blob_is_cached(self):
+        # arrange
+        blob_storage_client, _, blob = _create_initialized_gcs_client()
+        blob.exists.return_value = True
+
+        # act
+        first = blob_storage_client.blob_exists('blob-name')
+        second = blob_storage_client.blob_exists('blob-name')
+
+        # assert
+        self.assertTrue(first)
+        self.assertTrue(second)
+        blob.exists.assert_called_once()
+
+    def test_uploaded_blob_is_known_to_exist(self):
+        # arrange
+        blob_storage_client, _, blob = _create_initialized_gcs_client()
+
+        # act
+        blob_storage_client.upload_bytes('blob-name', b'bytes')
+        result = blob_storage_client.blob_exists('blob-name')
+
+        # assert
+        self.assertTrue(result)
+        blob.exists.assert_not_called()
+
+    def test_existing_blob_is_cached_until_ttl_expires(self):
+        # arrange
+        blob_storage_client, _, blob = _create_initialized_gcs_client()
+        blob.exists.side_effect = [True, False]
+
+        # act
+        with patch('app.services.blob_storage_client.time.monotonic', return_value=100.0):
+            first = blob_storage_client.blob_exists('blob-name')
+            second = blob_storage_client.blob_exists('blob-name')
+        with patch('app.services.blob_storage_client.time.monotonic', return_value=200.0):
+            third = blob_storage_client.blob_exists('blob-name')
+
+        # assert
+        self.assertTrue(first)
+        self.assertTrue(second)
+        self.assertFalse(third)
+        self.assertEqual(blob.exists.call_count, 2)
+
+    def test_missing_blob_is_not_cached(self):
+        # arrange
+        blob_storage_client, _, blob = _create_initialized_gcs_client()
+        blob.exists.side_effect = [False, True]
+
+        # act
+        first = blob_storage_client.blob_exists('blob-name')
+        second = blob_storage_client.blob_exists('blob-name')
+
+        # assert
+        self.assertFalse(first)
+        self.assertTrue(second)
+        self.assertEqual(blob.exists.call_count, 2)
+
+    def test_uploaded_blob_is_known_to_exist_after_missing(self):
+        # arrange
+        blob_storage_client, _, blob = _create_initialized_gcs_client()
+        blob.exists.return_value = False
+        blob.reload.side_effect = NotFound('missing')
 
         # act
-        result = await blob_storage_client.blob_exists(blob_name)
+        before_upload = blob_storage_client.blob_exists('blob-name')
+        blob_storage_client.upload_bytes('blob-name', b'bytes')
+        after_upload = blob_storage_client.blob_exists('blob-name')
 
         # assert
-        container_client.get_blob_client.assert_called_once_with(blob_name)
-        blob_client.exists.assert_called_once_with()
-        self.assertEqual(result, True)
+        self.assertFalse(before_upload)
+        self.assertTrue(after_upload)
+        blob.exists.assert_called_once()
 
-    
-    async def test_blob_client_not_exists_throws_exception(self):
+    def test_invalidate_forgets_cached_blob(self):
+        # arrange
+        blob_storage_client, _, blob = _create_initialized_gcs_client()
+        blob.exists.return_value = True
+
+        # act
+        blob_storage_client.blob_exists('blob-name')
+        blob_storage_client.invalidate('blob-name')
+        blob_storage_client.blob_exists('blob-name')
+
+        # assert
+        self.assertEqual(blob.exists.call_count, 2)
+
+    def test_not_initialized_throws_exception(self):
         # arrange
         blob_storage_client = BlobStorageClient(MagicMock(), MagicMock())
 
         # act
         with self.assertRaises(Exception) as e:
-            await blob_storage_client.blob_exists('blob-name')
+            blob_storage_client.blob_exists('blob-name')
 
         # assert
         self.assertEqual(str(e.exception), 'Blob storage client is not initialized')
+
+
+class TestGcsGetUri(unittest.TestCase):
+    def test_happy_path(self):
+        # arrange
+        blob_storage_client, bucket, _ = _create_initialized_gcs_client()
+        bucket.name = 'bucket'
+
+        # act
+        result = blob_storage_client.get_uri('pid-id/image.png')
+
+        # assert
+        self.assertEqual(result, 'gs://bucket/pid-id/image.png')
+
+
+class TestGcsInit(unittest.TestCase):
+    def test_http_pool_sized_for_workers(self):
+        # arrange
+        config = MagicMock()
+        config.gcs_bucket_name = 'bucket'
+        config.gcp_project = 'project'
+        config.workers_count_for_data_batch = 10
+        storage_client = MagicMock()
+        blob_storage_client = BlobStorageClient(config, MagicMock())
+
+        # act
+        with patch('google.cloud.storage.Client', return_value=storage_client):
+            blob_storage_client.init()
+
+        # assert
+        self.assertEqual(storage_client._http.mount.call_count, 2)
+        adapter = storage_client._http.mount.call_args[0][1]
+        self.assertEqual(adapter._pool_maxsize, 40)
+        storage_client.get_bucket.assert_called_once_with('bucket')
+
+    def test_credentials_refreshed_and_next_refresh_scheduled(self):
+        # arrange
+        config = MagicMock()
+        config.gcs_bucket_name = 'bucket'
+        config.gcp_project = 'project'
+        config.workers_count_for_data_batch = 1
+        credentials = MagicMock()
+        credentials.expiry = datetime.utcnow() + timedelta(hours=1)
+        blob_storage_client = BlobStorageClient(config, credentials)
+
+        # act
+        with patch('google.cloud.storage.Client'), \
+             patch('app.services.blob_storage_client.threading.Timer') as timer:
+            blob_storage_client.init()
+
+        # assert
+        credentials.refresh.assert_called_once()
+        delay_seconds = timer.call_args[0][0]
+        self.assertTrue(3000 < delay_seconds <= 3300)
+        timer.return_value.start.assert_called_once_with()
+
+    def test_anonymous_credentials_are_not_refreshed(self):
+        # arrange
+        config = MagicMock()
+        config.gcs_bucket_name = 'bucket'
+        config.gcp_project = 'project'
+        config.workers_count_for_data_batch = 1
+        credentials = MagicMock(AnonymousCredentials)
+        blob_storage_client = BlobStorageClient(config, credentials)
+
+        # act
+        with patch('google.cloud.storage.Client'), \
+             patch('app.services.blob_storage_client.threading.Timer') as timer:
+            blob_storage_client.init()
+
+        # assert
+        credentials.refresh.assert_not_called()
+        timer.assert_not_called()
+
+    def test_credentials_without_expiry_are_not_scheduled_for_refresh(self):
+        # arrange
+        credentials = MagicMock()
+        credentials.expiry = None
+        blob_storage_client = BlobStorageClient(MagicMock(), credentials)
+
+        # act
+        with patch('app.services.blob_storage_client.threading.Timer') as timer:
+            blob_storage_client._refresh_credentials(credentials)
+
+        # assert
+        credentials.refresh.assert_called_once()
+        timer.assert_not_called()
+
+    def test_failed_refresh_is_retried_with_backoff(self):
+        # arrange
+        credentials = MagicMock()
+        credentials.refresh.side_effect = Exception('refresh failed')
+        blob_storage_client = BlobStorageClient(MagicMock(), credentials)
+
+        # act
+        with patch('app.services.blob_storage_client.threading.Timer') as timer:
+            blob_storage_client._refresh_credentials(credentials, 2)
+
+        # assert
+        timer.assert_called_once()
+        self.assertEqual(timer.call_args[0][0], CREDENTIALS_REFRESH_RETRY_SECONDS * 4)
+        self.assertEqual(timer.call_args[1]['args'], (credentials, 3))
+
+    def test_refresh_is_given_up_after_repeated_failures(self):
+        # arrange
+        credentials = MagicMock()
+        credentials.refresh.side_effect = Exception('refresh failed')
+        blob_storage_client = BlobStorageClient(MagicMock(), credentials)
+
+        # act
+        with patch('app.services.blob_storage_client.threading.Timer') as timer:
+            blob_storage_client._refresh_credentials(credentials, CREDENTIALS_REFRESH_MAX_FAILURES - 1)
+
+        # assert
+        timer.assert_not_called()
+
+
+class TestGetBlobStorageClient(unittest.TestCase):
+    def setUp(self):
+        get_blob_storage_client.cache_clear()
+
+    def tearDown(self):
+        get_blob_storage_client.cache_clear()
+
+    def test_client_is_initialized_once_and_shared(self):
+        # arrange
+        config = MagicMock()
+
+        # act
+        with patch('app.services.blob_storage_client.get_config', return_value=config), \
+             patch.object(BlobStorageClient, 'init') as init:
+            first = get_blob_storage_client()
+            second = get_blob_storage_client()
+
+        # assert
+        self.assertIs(first, second)
+        self.assertIs(first._config, config)
+        init.assert_called_once_with()
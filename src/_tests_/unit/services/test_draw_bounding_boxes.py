@@ -5,11 +5,13 @@ import unittest
 import sys
 import json
 import cv2
+import numpy as np
 
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', '..', '..'))
 from app.services.draw_elements import draw_bounding_boxes
 from app.models.symbol_detection.symbol_detection_inference_response import SymbolDetectionInferenceResponse
 from app.models.bounding_box import BoundingBox
+from app.models.image_details import ImageDetails
 
 
 input_data_path = os.path.join(os.path.dirname(__file__), 'data', 'input')
@@ -84,6 +86,39 @@ class TestDrawBoundingBoxes(unittest.TestCase):
         actual_image_bytes = cv2.imencode('.png', actual_image)[1].tobytes()
         self.assertEqual(actual_image_bytes, expect_image_bytes)
 
+    def test_happy_path_with_decoded_image(self):
+        # arrange
+        image_details = ImageDetails(height=100, width=200)
+        bounding_boxes = [
+            BoundingBox(topX=0.1, topY=0.1, bottomX=0.4, bottomY=0.5),
+            BoundingBox(topX=0.5, topY=0.2, bottomX=0.9, bottomY=0.8)
+        ]
+        labels = ['Instrument/Valve', 'Piping/Endpoint']
+        input_image = np.full((100, 200, 3), 255, dtype=np.uint8)
+        input_image_bytes = cv2.imencode('.png', input_image)[1].tobytes()
+
+        expect_image = draw_bounding_boxes(
+            image_bytes=input_image_bytes,
+            image_details=image_details,
+            ids=[1, 2],
+            bounding_boxes=bounding_boxes,
+            annotations=labels
+        )
+
+        # act
+        actual_image = draw_bounding_boxes(
+            image_bytes=input_image,
+            image_details=image_details,
+            ids=[1, 2],
+            bounding_boxes=bounding_boxes,
+            annotations=labels
+        )
+
+        # assert
+        self.assertIs(actual_image, input_image)
+        self.assertTrue(np.array_equal(actual_image, expect_image))
+        self.assertFalse(np.all(actual_image == 255))
+
     def test_when_len_bounding_boxes_not_match_len_labels_throws_value_error(self):
         # arrange
         input_image_path = os.path.join(input_data_path, 'image.png')
@@ -77,4 +77,17 @@ class TestBuildInferenceJobStatusPath(unittest.TestCase):
         result = storage_path_template_builder.build_inference_job_status_path(pid_id, inference_result)
 
         # assert
-        self.assertEqual(result, f'{pid_id}/graph-construction/job_status.json')
\ No newline at end of file
+        self.assertEqual(result, f'{pid_id}/graph-construction/job_status.json')
+
+
+class TestBuildOcrImagePath(unittest.TestCase):
+    def test_happy_path(self):
+        # arrange
+        pid_id = 'pid-id'
+        inference_result = InferenceResult.text_detection
+
+        # act
+        result = storage_path_template_builder.build_ocr_image_path(pid_id, inference_result, 'webp')
+
+        # assert
+        self.assertEqual(result, f'{pid_id}/text-detection/ocr_{pid_id}.webp')
@@ -1,14 +1,27 @@
 # Copyright (c) Microsoft Corporation.
 # Licensed under the MIT license.
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+import numpy as np
 import os
 import parameterized
 import unittest
-from unittest.mock import patch, call, ANY
+from unittest.mock import patch, call
 import sys
+import threading
 from fastapi import HTTPException
 
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', '..', '..'))
 from app.services.text_detection import run_inferencing
+from app.services.text_detection.text_detection_service import (
+    _compile_label_prefix_pattern,
+    _convert_text_detection_to_text_details,
+    _encode_image_array_for_ocr,
+    _encode_image_for_ocr,
+    _get_image_format,
+    _read_text,
+    _write_image_in_background,
+    OUTPUT_IMAGE_PNG_PARAMS)
 from app.models.symbol_detection.symbol_detection_inference_response import SymbolDetectionInferenceResponse
 from app.models.symbol_detection.label import Label
 from app.models.text_detection.symbol_and_text_associated import SymbolAndTextAssociated
@@ -16,11 +29,14 @@ from app.models.text_detection.text_recognized import TextRecognized
 from app.models.text_detection.text_detection_inference_response import TextDetectionInferenceResponse
 from app.models.bounding_box import BoundingBox
 from app.models.image_details import ImageDetails
+from app.models.enums.inference_result import InferenceResult
+from app.services.text_detection.utils.text_detection_image_preprocessor import TextDetectionImagePreprocessor
 
 
 class TestRunInferencing(unittest.TestCase):
     pid_id = 'pid-id'
     image = b'123'
+    preprocessed_image = np.zeros((100, 100), dtype=np.uint8)
     area_threshold = 0.8
     distance_threshold = 0.01
     symbol_label_prefixes_with_text = set(['lmi', 'tag'])
@@ -128,10 +144,11 @@ class TestRunInferencing(unittest.TestCase):
         # arrange
 
         # act
-        with patch('app.services.text_detection.text_detection_service.ocr_client.read_text') as mock_read_text, \
+        with patch('app.services.text_detection.text_detection_service.get_ocr_client') as mock_get_ocr_client, \
              patch('app.services.text_detection.text_detection_service.correlate_symbols_with_text') as mock_correlate_symbols_with_text, \
-             patch('app.services.text_detection.text_detection_service.TextDetectionImagePreprocessor.preprocess') as mock_preprocess:
-            mock_preprocess.return_value = self.image
+             patch.object(TextDetectionImagePreprocessor, 'preprocess_image') as mock_preprocess:
+            mock_preprocess.return_value = self.preprocessed_image
+            mock_read_text = mock_get_ocr_client.return_value.read_text
             mock_read_text.return_value = self.read_text_result
             mock_correlate_symbols_with_text.return_value = self.correlate_symbols_with_text
             result = run_inferencing(
@@ -171,15 +188,19 @@ class TestRunInferencing(unittest.TestCase):
         debug_image_symbol_and_text_path='debug_symbol_and_text.png'
 
         # act
-        with patch('app.services.text_detection.text_detection_service.ocr_client.read_text') as mock_read_text, \
+        with patch('app.services.text_detection.text_detection_service.get_ocr_client') as mock_get_ocr_client, \
             patch('app.services.text_detection.text_detection_service.correlate_symbols_with_text') as mock_correlate_symbols_with_text, \
-            patch('app.services.text_detection.text_detection_service.TextDetectionImagePreprocessor.preprocess') as mock_preprocess, \
+            patch.object(TextDetectionImagePreprocessor, 'preprocess_image') as mock_preprocess, \
             patch('app.services.text_detection.text_detection_service.draw_bounding_boxes') as mock_draw_bounding_boxes, \
             patch('app.services.text_detection.text_detection_service.config') as mock_config, \
             patch('app.services.text_detection.text_detection_service.does_string_contain_at_least_one_number_and_one_letter') as mock_does_string_contain_at_least_one_number_and_one_letter, \
-            patch('cv2.imwrite') as mock_imwrite:
+            patch('cv2.imwrite') as mock_imwrite, \
+            patch('app.services.text_detection.text_detection_service._IO_POOL') as mock_io_pool, \
+            patch('app.services.text_detection.text_detection_service._PENDING_IMAGE_WRITES'), \
+            patch('app.services.text_detection.text_detection_service.cv2.imdecode') as mock_imdecode:
             mock_draw_bounding_boxes.return_value = self.image
-            mock_preprocess.return_value = self.image
+            mock_preprocess.return_value = self.preprocessed_image
+            mock_read_text = mock_get_ocr_client.return_value.read_text
             mock_read_text.return_value = self.read_text_result
             mock_config.debug = True
             mock_correlate_symbols_with_text.return_value = self.correlate_symbols_with_text
@@ -219,7 +240,7 @@ class TestRunInferencing(unittest.TestCase):
         expected_bounding_boxes_call1 = [BoundingBox(**result.dict()) for result in self.correlate_symbols_with_text if result.label != 'arrow']
         expected_labels_call1 = [result.text_associated for result in self.correlate_symbols_with_text if result.label != 'arrow']
         expected_ids_call2 = None
-        expected_bounding_boxes_call2 = [BoundingBox(**result.dict()) for result in self.all_text_list]
+        expected_bounding_boxes_call2 = self.all_text_list
         expected_labels_call2 = [result.text for result in self.all_text_list]
         valid_bit_array1 = [
             1 for result in self.correlate_symbols_with_text if result.label != 'arrow'
@@ -227,7 +248,7 @@ class TestRunInferencing(unittest.TestCase):
         mock_draw_bounding_boxes.assert_has_calls(
             calls=[
                 call(
-                    self.image,
+                    mock_imdecode.return_value.copy.return_value,
                     self.symbol_detection_result.image_details,
                     expected_ids_call1,
                     expected_bounding_boxes_call1,
@@ -235,7 +256,7 @@ class TestRunInferencing(unittest.TestCase):
                     valid_bit_array1
                 ),
                 call(
-                    self.image,
+                    mock_imdecode.return_value,
                     self.symbol_detection_result.image_details,
                     expected_ids_call2,
                     expected_bounding_boxes_call2,
@@ -244,21 +265,24 @@ class TestRunInferencing(unittest.TestCase):
             ],
             any_order=True
         )
-        mock_imwrite.assert_has_calls(
+        mock_imdecode.assert_called_once()
+        mock_io_pool.submit.assert_has_calls(
             calls=[
-                call(debug_image_text_path, self.image),
-                call(debug_image_symbol_and_text_path, self.image)
+                call(mock_imwrite, debug_image_text_path, self.image, OUTPUT_IMAGE_PNG_PARAMS),
+                call(mock_imwrite, debug_image_symbol_and_text_path, self.image, OUTPUT_IMAGE_PNG_PARAMS)
             ],
             any_order=True
         )
+        mock_io_pool.submit.return_value.exception.assert_called_once_with()
 
     def test_when_ocr_client_throws_exception_then_raises_http_exception(self):
         # arrange
 
         # act
-        with patch('app.services.text_detection.text_detection_service.TextDetectionImagePreprocessor.preprocess') as mock_preprocess, \
-             patch('app.services.text_detection.text_detection_service.ocr_client.read_text') as mock_read_text:
-            mock_preprocess.return_value = self.image
+        with patch.object(TextDetectionImagePreprocessor, 'preprocess_image') as mock_preprocess, \
+             patch('app.services.text_detection.text_detection_service.get_ocr_client') as mock_get_ocr_client:
+            mock_preprocess.return_value = self.preprocessed_image
+            mock_read_text = mock_get_ocr_client.return_value.read_text
             mock_read_text.side_effect = Exception('Error')
             with self.assertRaises(HTTPException) as exception:
                 run_inferencing(
@@ -274,4 +298,291 @@ class TestRunInferencing(unittest.TestCase):
 
         # assert
         self.assertEqual(exception.exception.status_code, 500)
-        self.assertEqual(exception.exception.detail, 'There was an internal issue performing OCR on the image.')
\ No newline at end of file
+        self.assertEqual(exception.exception.detail, 'There was an internal issue performing OCR on the image.')
+
+
+class TestConvertTextDetectionToTextDetails(unittest.TestCase):
+    def test_bounding_boxes_are_reduced_and_normalized(self):
+        # arrange
+        text_detection_results = [
+            ('lmi', [(20, 10), (10, 30), (40, 20), (30, 50)]),
+            ('tag', [(50, 60), (70, 80)]),
+            ('empty', [])
+        ]
+
+        # act
+        result = _convert_text_detection_to_text_details(text_detection_results, image_height=100, image_width=200)
+
+        # assert
+        self.assertEqual(result, [
+            TextRecognized(text='lmi', topX=0.05, topY=0.1, bottomX=0.2, bottomY=0.5),
+            TextRecognized(text='tag', topX=0.25, topY=0.6, bottomX=0.35, bottomY=0.8),
+            TextRecognized(text='empty', topX=0.0, topY=0.0, bottomX=0.0, bottomY=0.0)
+        ])
+
+    def test_polygons_with_more_than_4_vertices_use_the_first_4(self):
+        # arrange
+        text_detection_results = [
+            ('lmi', [(20, 10), (40, 10), (40, 30), (20, 30), (90, 90)]),
+            ('tag', [(50, 60), (70, 60), (70, 80), (50, 80), (0, 0)])
+        ]
+
+        # act
+        result = _convert_text_detection_to_text_details(text_detection_results, image_height=100, image_width=200)
+
+        # assert
+        self.assertEqual(result, [
+            TextRecognized(text='lmi', topX=0.1, topY=0.1, bottomX=0.2, bottomY=0.3),
+            TextRecognized(text='tag', topX=0.25, topY=0.6, bottomX=0.35, bottomY=0.8)
+        ])
+
+    def test_no_results(self):
+        # act
+        result = _convert_text_detection_to_text_details([], image_height=100, image_width=200)
+
+        # assert
+        self.assertEqual(result, [])
+
+
+class TestEncodeImageForOcr(unittest.TestCase):
+    def test_small_image_is_returned_as_is(self):
+        # arrange
+        image = b'123'
+
+        # act
+        result = _encode_image_for_ocr(image)
+
+        # assert
+        self.assertIs(result, image)
+
+    def test_large_image_is_reencoded_with_same_dimensions(self):
+        # arrange
+        pixels = np.random.default_rng(0).integers(0, 256, (600, 600, 3), dtype=np.uint8)
+        pixels[:300] = 255
+        image = cv2.imencode('.png', pixels)[1].tobytes()
+
+        # act
+        result = _encode_image_for_ocr(image)
+
+        # assert
+        self.assertLess(len(result), len(image))
+        decoded = cv2.imdecode(np.frombuffer(result, np.uint8), cv2.IMREAD_UNCHANGED)
+        self.assertEqual(decoded.shape, pixels.shape)
+
+    def test_undecodable_image_is_returned_as_is(self):
+        # arrange
+        image = b'0' * (600 * 1024)
+
+        # act
+        result = _encode_image_for_ocr(image)
+
+        # assert
+        self.assertIs(result, image)
+
+    def test_16_bit_image_is_reencoded_as_8_bit(self):
+        # arrange
+        pixels = np.random.default_rng(0).integers(0, 65536, (600, 600), dtype=np.uint16)
+        image = cv2.imencode('.png', pixels)[1].tobytes()
+
+        # act
+        result = _encode_image_for_ocr(image)
+
+        # assert
+        decoded = cv2.imdecode(np.frombuffer(result, np.uint8), cv2.IMREAD_UNCHANGED)
+        self.assertEqual(decoded.dtype, np.uint8)
+        self.assertEqual(decoded.shape[:2], pixels.shape)
+
+
+class TestEncodeImageArrayForOcr(unittest.TestCase):
+    def test_image_from_small_source_is_png_encoded(self):
+        # arrange
+        image = np.zeros((10, 10), dtype=np.uint8)
+
+        # act
+        result = _encode_image_array_for_ocr(image, 1024)
+
+        # assert
+        self.assertTrue(result.startswith(b'\x89PNG'))
+
+    def test_image_from_large_source_is_webp_encoded_with_same_dimensions(self):
+        # arrange
+        image = np.random.default_rng(0).integers(0, 256, (600, 600), dtype=np.uint8)
+
+        # act
+        result = _encode_image_array_for_ocr(image, 600 * 1024)
+
+        # assert
+        self.assertEqual(result[8:12], b'WEBP')
+        decoded = cv2.imdecode(np.frombuffer(result, np.uint8), cv2.IMREAD_GRAYSCALE)
+        self.assertEqual(decoded.shape, image.shape)
+
+    def test_16_bit_image_is_png_encoded(self):
+        # arrange
+        image = np.zeros((10, 10), dtype=np.uint16)
+
+        # act
+        result = _encode_image_array_for_ocr(image, 600 * 1024)
+
+        # assert
+        decoded = cv2.imdecode(np.frombuffer(result, np.uint8), cv2.IMREAD_UNCHANGED)
+        self.assertEqual(decoded.dtype, np.uint16)
+
+
+class TestCompileLabelPrefixPattern(unittest.TestCase):
+    @parameterized.parameterized.expand([
+        ('Instrument/Valve', True),
+        ('instrument/valve', True),
+        ('EQUIPMENT/Pump', True),
+        ('Piping/Endpoint/Pagination', True),
+        ('Piping/Fitting', False),
+        ('Valve/Instrument/', False),
+    ])
+    def test_label_prefixes_are_matched_case_insensitively(self, label, expected):
+        # arrange
+        pattern = _compile_label_prefix_pattern(('equipment/', 'instrument/', 'piping/endpoint/pagination'))
+
+        # act
+        result = pattern.match(label) is not None
+
+        # assert
+        self.assertEqual(result, expected)
+
+    def test_no_prefixes_match_no_label(self):
+        # act
+        result = _compile_label_prefix_pattern(()).match('Instrument/Valve')
+
+        # assert
+        self.assertIsNone(result)
+
+
+class TestReadText(unittest.TestCase):
+    def test_small_image_is_sent_inline(self):
+        # arrange
+        image = b'123'
+
+        # act
+        with patch('app.services.text_detection.text_detection_service.get_ocr_client') as mock_get_ocr_client, \
+             patch('app.services.text_detection.text_detection_service.get_blob_storage_client') as mock_get_blob_storage_client:
+            result = _read_text('pid-id', image)
+
+        # assert
+        mock_ocr_client = mock_get_ocr_client.return_value
+        self.assertEqual(result, mock_ocr_client.read_text.return_value)
+        mock_ocr_client.read_text.assert_called_once_with(image)
+        mock_get_blob_storage_client.assert_not_called()
+
+    def test_large_image_is_read_from_storage(self):
+        # arrange
+        image = b'RIFF\x00\x00\x00\x00WEBP' + b'0' * 7_000_000
+
+        # act
+        with patch('app.services.text_detection.text_detection_service.get_ocr_client') as mock_get_ocr_client, \
+             patch('app.services.text_detection.text_detection_service.get_blob_storage_client') as mock_get_blob_storage_client, \
+             patch('app.services.storage_path_template_builder.build_ocr_image_path') as mock_build_ocr_image_path:
+            blob_storage_client = mock_get_blob_storage_client.return_value
+            blob_storage_client.get_uri.return_value = 'gs://bucket/pid-id/text-detection/ocr_pid-id.webp'
+            mock_build_ocr_image_path.return_value = 'pid-id/text-detection/ocr_pid-id.webp'
+            result = _read_text('pid-id', image)
+
+        # assert
+        mock_ocr_client = mock_get_ocr_client.return_value
+        self.assertEqual(result, mock_ocr_client.read_text_uri.return_value)
+        mock_build_ocr_image_path.assert_called_once_with('pid-id', InferenceResult.text_detection, 'webp')
+        blob_storage_client.upload_bytes.assert_called_once_with(
+            'pid-id/text-detection/ocr_pid-id.webp', image, content_type='image/webp')
+        mock_ocr_client.read_text_uri.assert_called_once_with('gs://bucket/pid-id/text-detection/ocr_pid-id.webp')
+        mock_ocr_client.read_text.assert_not_called()
+        blob_storage_client.delete_blob.assert_called_once_with('pid-id/text-detection/ocr_pid-id.webp')
+
+    def test_staged_image_is_deleted_when_ocr_fails(self):
+        # arrange
+        image = b'0' * 7_000_000
+
+        # act
+        with patch('app.services.text_detection.text_detection_service.get_ocr_client') as mock_get_ocr_client, \
+             patch('app.services.text_detection.text_detection_service.get_blob_storage_client') as mock_get_blob_storage_client, \
+             patch('app.services.storage_path_template_builder.build_ocr_image_path') as mock_build_ocr_image_path:
+            blob_storage_client = mock_get_blob_storage_client.return_value
+            mock_build_ocr_image_path.return_value = 'pid-id/text-detection/ocr_pid-id.bin'
+            mock_get_ocr_client.return_value.read_text_uri.side_effect = Exception('Error')
+            with self.assertRaises(Exception):
+                _read_text('pid-id', image)
+
+        # assert
+        mock_build_ocr_image_path.assert_called_once_with('pid-id', InferenceResult.text_detection, 'bin')
+        blob_storage_client.delete_blob.assert_called_once_with('pid-id/text-detection/ocr_pid-id.bin')
+
+
+class TestGetImageFormat(unittest.TestCase):
+    @parameterized.parameterized.expand([
+        (cv2.imencode('.png', np.zeros((2, 2), np.uint8))[1].tobytes(), ('png', 'image/png')),
+        (cv2.imencode('.jpg', np.zeros((2, 2), np.uint8))[1].tobytes(), ('jpg', 'image/jpeg')),
+        (cv2.imencode('.webp', np.zeros((2, 2, 3), np.uint8))[1].tobytes(), ('webp', 'image/webp')),
+        (b'123', ('bin', 'application/octet-stream')),
+    ])
+    def test_happy_path(self, image, expected_format):
+        # act
+        result = _get_image_format(image)
+
+        # assert
+        self.assertEqual(result, expected_format)
+
+
+class TestWriteImageInBackground(unittest.TestCase):
+    def test_happy_path(self):
+        # arrange
+        image = np.zeros((10, 10, 3), dtype=np.uint8)
+
+        # act
+        with patch('cv2.imwrite') as mock_imwrite:
+            mock_imwrite.return_value = True
+            result = _write_image_in_background('output.png', image).result()
+
+        # assert
+        self.assertTrue(result)
+        mock_imwrite.assert_called_once_with('output.png', image, OUTPUT_IMAGE_PNG_PARAMS)
+
+    def test_when_imwrite_throws_exception_then_logs_error(self):
+        # arrange
+        image = np.zeros((10, 10, 3), dtype=np.uint8)
+
+        # act
+        # the pool is shut down before asserting, so the done callback has run
+        with patch('cv2.imwrite') as mock_imwrite, \
+             patch('app.services.text_detection.text_detection_service.logger') as mock_logger, \
+             ThreadPoolExecutor(max_workers=1) as io_pool, \
+             patch('app.services.text_detection.text_detection_service._IO_POOL', io_pool):
+            mock_imwrite.side_effect = Exception('upload failed')
+            future = _write_image_in_background('output.png', image)
+
+        self.assertIsInstance(future.exception(), Exception)
+
+        # assert
+        mock_logger.error.assert_called_once_with('Error saving text detection output images: upload failed')
+
+    def test_pending_writes_are_bounded(self):
+        # arrange
+        image = np.zeros((10, 10, 3), dtype=np.uint8)
+        pending_image_writes = threading.BoundedSemaphore(1)
+        write_started = threading.Event()
+        finish_write = threading.Event()
+
+        def slow_imwrite(*args):
+            write_started.set()
+            finish_write.wait()
+            return True
+
+        # act
+        with patch('cv2.imwrite', side_effect=slow_imwrite), \
+             ThreadPoolExecutor(max_workers=2) as io_pool, \
+             patch('app.services.text_detection.text_detection_service._IO_POOL', io_pool), \
+             patch('app.services.text_detection.text_detection_service._PENDING_IMAGE_WRITES', pending_image_writes):
+            first_write = _write_image_in_background('first.png', image)
+            write_started.wait()
+            second_write_queued = pending_image_writes.acquire(blocking=False)
+            finish_write.set()
+            first_write.result()
+
+        # assert
+        self.assertFalse(second_write_queued)
+        self.assertTrue(pending_image_writes.acquire(blocking=False))
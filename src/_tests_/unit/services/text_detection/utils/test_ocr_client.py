@@ -1,68 +1,196 @@
 # Copyright (c) Microsoft Corporation.
 # Licensed under the MIT license.
-from azure.ai.formrecognizer import AnalysisFeature
 import os
 import unittest
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, patch
 import sys
+from google.cloud import vision
 
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', '..', '..', '..'))
-from app.services.text_detection.utils.ocr_client import OcrClient
+from app.services.text_detection.utils.ocr_client import OCRClient, get_ocr_client
 
 
-class TestReadText(unittest.IsolatedAsyncioTestCase):
+def _create_vision_response(texts_and_vertices, error_message=''):
+    annotations = [vision.EntityAnnotation(description='full text')]
+    for text, vertices in texts_and_vertices:
+        annotations.append(vision.EntityAnnotation(
+            description=text,
+            bounding_poly=vision.BoundingPoly(vertices=[vision.Vertex(x=x, y=y) for x, y in vertices])))
+
+    return vision.AnnotateImageResponse(
+        error={'message': error_message},
+        text_annotations=annotations)
+
+
+class TestOCRClientReadTextBatch(unittest.TestCase):
     def test_happy_path(self):
         # arrange
-        ocr_client = OcrClient(MagicMock())
+        ocr_client = OCRClient()
+        ocr_client._client = MagicMock()
+        ocr_client._client.batch_annotate_images.return_value.responses = [
+            _create_vision_response([('text_1', [(1, 2), (3, 2), (3, 4), (1, 4)])]),
+            _create_vision_response([('text_2', [(5, 6), (7, 8)])])
+        ]
 
-        image = b"test_image"
+        # act
+        result = ocr_client.read_text_batch([b'image_1', b'image_2'])
+
+        # assert
+        self.assertEqual(result, [
+            [('text_1', [(1, 2), (3, 2), (3, 4), (1, 4)])],
+            [('text_2', [(5, 6), (7, 6), (7, 8), (5, 8)])]
+        ])
+        ocr_client._client.batch_annotate_images.assert_called_once()
 
-        line_1 = MagicMock()
-        line_1.content = "test_text"
-        line_1.polygon = [[1, 2], [3, 4], [5, 6], [7, 8]]
+    def test_unset_vertex_coordinates_are_read_as_zero(self):
+        # arrange
+        ocr_client = OCRClient()
+        ocr_client._client = MagicMock()
+        ocr_client._client.batch_annotate_images.return_value.responses = [
+            vision.AnnotateImageResponse(text_annotations=[
+                vision.EntityAnnotation(description='full text'),
+                vision.EntityAnnotation(
+                    description='text_1',
+                    bounding_poly=vision.BoundingPoly(vertices=[
+                        vision.Vertex(), vision.Vertex(x=3), vision.Vertex(x=3, y=4), vision.Vertex(y=4)]))
+            ])
+        ]
 
-        line_2 = MagicMock()
-        line_2.content = "test_text_2"
-        line_2.polygon = [[9, 10], [11, 12], [13, 14], [15, 16]]
+        # act
+        result = ocr_client.read_text_batch([b'image_1'])
 
-        page_1 = MagicMock()
-        page_1.lines = [line_1, line_2]
-        result = MagicMock()
-        result.pages = [page_1]
+        # assert
+        self.assertEqual(result, [[('text_1', [(0, 0), (3, 0), (3, 4), (0, 4)])]])
 
-        poller = MagicMock()
-        poller.result.return_value = result
-        ocr_client._document_analysis_client.begin_analyze_document.return_value = poller
+    def test_images_are_sent_in_batches_of_16(self):
+        # arrange
+        ocr_client = OCRClient()
+        ocr_client._client = MagicMock()
+        images = [f'image_{i}'.encode() for i in range(20)]
+        ocr_client._client.batch_annotate_images.side_effect = lambda requests: MagicMock(
+            responses=[_create_vision_response([(request.image.content.decode(), [(0, 0)] * 4)]) for request in requests])
 
         # act
-        result = ocr_client.read_text(image)
+        result = ocr_client.read_text_batch(images)
 
         # assert
-        actual_results = list(result)
-        self.assertEqual(actual_results, [("test_text", [[1, 2], [3, 4], [5, 6], [7, 8]]), ("test_text_2", [[9, 10], [11, 12], [13, 14], [15, 16]])])
-        ocr_client._document_analysis_client.begin_analyze_document.assert_called_once_with(
-            "prebuilt-read",
-            image,
-            features=[AnalysisFeature.OCR_HIGH_RESOLUTION])
-
-    def test_when_no_result_from_poller_then_raises_exception(self):
+        self.assertEqual([image_results[0][0] for image_results in result], [image.decode() for image in images])
+        batch_sizes = [len(c.kwargs['requests']) for c in ocr_client._client.batch_annotate_images.call_args_list]
+        self.assertEqual(sorted(batch_sizes), [4, 16])
+
+    def test_when_response_has_error_then_raises_exception(self):
         # arrange
-        ocr_client = OcrClient(MagicMock())
+        ocr_client = OCRClient()
+        ocr_client._client = MagicMock()
+        ocr_client._client.batch_annotate_images.return_value.responses = [
+            _create_vision_response([], error_message='Bad image')
+        ]
 
-        image = b"test_image"
+        # act
+        with self.assertRaises(RuntimeError) as context:
+            ocr_client.read_text_batch([b'image'])
 
-        poller = MagicMock()
-        poller.result.return_value = None
-        ocr_client._document_analysis_client.begin_analyze_document.return_value = poller
+        # assert
+        self.assertEqual(str(context.exception), 'Vision API error: Bad image')
+
+    def test_repeated_image_is_served_from_cache(self):
+        # arrange
+        ocr_client = OCRClient()
+        ocr_client._client = MagicMock()
+        ocr_client._client.batch_annotate_images.return_value.responses = [
+            _create_vision_response([('text', [(1, 2), (3, 2), (3, 4), (1, 4)])])
+        ]
 
         # act
-        with self.assertRaises(Exception) as context:
-            list(ocr_client.read_text(image))
+        first_result = ocr_client.read_text_batch([b'image', b'image'])
+        second_result = ocr_client.read_text_batch([b'image'])
 
         # assert
-        self.assertEqual(str(context.exception), "No text detected")
-        ocr_client._document_analysis_client.begin_analyze_document.assert_called_once_with(
-            "prebuilt-read",
-            image,
-            features=[AnalysisFeature.OCR_HIGH_RESOLUTION])
+        expected_result = [('text', [(1, 2), (3, 2), (3, 4), (1, 4)])]
+        self.assertEqual(first_result, [expected_result, expected_result])
+        self.assertEqual(second_result, [expected_result])
+        ocr_client._client.batch_annotate_images.assert_called_once()
+        self.assertEqual(len(ocr_client._client.batch_annotate_images.call_args.kwargs['requests']), 1)
+
+    def test_read_text_uri_references_image_in_storage(self):
+        # arrange
+        ocr_client = OCRClient()
+        ocr_client._client = MagicMock()
+        ocr_client._client.batch_annotate_images.return_value.responses = [
+            _create_vision_response([('text', [(1, 2), (3, 2), (3, 4), (1, 4)])])
+        ]
+
+        # act
+        result = ocr_client.read_text_uri('gs://bucket/image')
+
+        # assert
+        self.assertEqual(result, [('text', [(1, 2), (3, 2), (3, 4), (1, 4)])])
+        request = ocr_client._client.batch_annotate_images.call_args.kwargs['requests'][0]
+        self.assertEqual(request.image.source.image_uri, 'gs://bucket/image')
+        self.assertEqual(request.image.content, b'')
+
+    def test_read_text_runs_a_batch_of_one(self):
+        # arrange
+        ocr_client = OCRClient()
 
+        # act
+        with patch.object(OCRClient, 'read_text_batch', return_value=[['result']]) as read_text_batch:
+            result = ocr_client.read_text(b'image')
+
+        # assert
+        self.assertEqual(result, ['result'])
+        read_text_batch.assert_called_once_with([b'image'])
+
+
+class TestOCRClientClient(unittest.TestCase):
+    def test_client_uses_grpc_channel_with_keepalive(self):
+        # arrange
+        ocr_client = OCRClient()
+
+        # act
+        with patch('google.cloud.vision.ImageAnnotatorClient') as image_annotator_client:
+            client = ocr_client.client
+            same_client = ocr_client.client
+
+        # assert
+        self.assertIs(client, same_client)
+        image_annotator_client.assert_called_once()
+        transport_class = image_annotator_client.get_transport_class.return_value
+        image_annotator_client.get_transport_class.assert_called_once_with('grpc')
+        options = dict(transport_class.create_channel.call_args.kwargs['options'])
+        self.assertEqual(options['grpc.keepalive_time_ms'], 30000)
+        self.assertEqual(options['grpc.keepalive_permit_without_calls'], 1)
+        transport_class.assert_called_once_with(
+            host='vision.googleapis.com', channel=transport_class.create_channel.return_value)
+
+    def test_warm_up_creates_the_client(self):
+        # arrange
+        ocr_client = OCRClient()
+
+        # act
+        with patch('google.cloud.vision.ImageAnnotatorClient') as image_annotator_client:
+            ocr_client.warm_up()
+            client = ocr_client.client
+
+        # assert
+        image_annotator_client.assert_called_once()
+        self.assertIs(client, image_annotator_client.return_value)
+
+
+class TestGetOcrClient(unittest.TestCase):
+    def setUp(self):
+        get_ocr_client.cache_clear()
+
+    def tearDown(self):
+        get_ocr_client.cache_clear()
+
+    def test_client_is_created_once_and_shared(self):
+        # act
+        with patch('google.cloud.vision.ImageAnnotatorClient') as image_annotator_client:
+            first = get_ocr_client()
+            second = get_ocr_client()
+
+        # assert
+        self.assertIs(first, second)
+        self.assertIsInstance(first, OCRClient)
+        image_annotator_client.assert_not_called()
@@ -30,5 +30,17 @@ class TestTextDetectionImagePreprocessor(unittest.TestCase):
         # Assert that the processed image has only one color channel (i.e. is grayscale)
         self.assertEqual(len(processed_image.shape), 2)
 
-        # Assert that the processed image is binary (only black or white pixels)
-        self.assertTrue(np.all(np.logical_or(processed_image == 0, processed_image == 255)))
+        # Assert that the processed image keeps the size of the original image
+        self.assertEqual(processed_image.shape, image.shape[:2])
+
+    def test_preprocess_image_returns_grayscale_array(self):
+        # arrange
+        image = np.random.default_rng(0).integers(0, 256, (50, 40, 3), dtype=np.uint8)
+        image_bytes = cv2.imencode('.png', image)[1].tobytes()
+
+        # act
+        processed_image = TextDetectionImagePreprocessor.preprocess_image(image_bytes)
+
+        # assert
+        self.assertEqual(processed_image.shape, (50, 40))
+        self.assertEqual(processed_image.dtype, np.uint8)
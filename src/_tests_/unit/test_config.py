@@ -3,10 +3,13 @@
 import os
 from pydantic import ValidationError
 import unittest
+from unittest.mock import patch
 import sys
+import logging
 
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
-from app.config import Config
+from app.config import Config, config, get_config
+import logger_config
 
 
 class TestConfig(unittest.TestCase):
@@ -29,7 +32,6 @@ class TestConfig(unittest.TestCase):
 
         # act
         config = Config(
-            gcs_bucket_name=gcs_bucket_name,
             gcs_bucket_name=gcs_bucket_name,
             #form_recognizer_endpoint=form_recognizer_endpoint,
             debug=debug,
@@ -82,7 +84,6 @@ class TestConfig(unittest.TestCase):
 
         # act
         config = Config(
-            gcs_bucket_name=gcs_bucket_name,
             gcs_bucket_name=gcs_bucket_name,
             #form_recognizer_endpoint=form_recognizer_endpoint,
             debug=debug,
@@ -136,3 +137,119 @@ class TestConfig(unittest.TestCase):
         #self.assertIn("form_recognizer_endpoint", exception_json)
         self.assertIn("symbol_detection_api", exception_json)
         self.assertIn("symbol_detection_api_bearer_token", exception_json)
+
+    def test_config_is_immutable_and_hashable(self):
+        # arrange
+        config = Config(
+            gcs_bucket_name='gcs_bucket_name',
+            symbol_detection_api='symbol_detection_api',
+            symbol_detection_api_bearer_token='symbol_detection_api_bearer_token',
+            symbol_label_prefixes_with_text='1,2'
+        )
+
+        # act
+        with self.assertRaises(TypeError):
+            config.debug = True
+
+        # assert
+        assert isinstance(config.symbol_label_prefixes_with_text, frozenset)
+        assert hash(config) == hash(config)
+
+
+class TestFromSnapshot(unittest.TestCase):
+    def test_happy_path(self):
+        # arrange
+        validated_config = Config(
+            gcs_bucket_name='gcs_bucket_name',
+            symbol_detection_api='symbol_detection_api',
+            symbol_detection_api_bearer_token='symbol_detection_api_bearer_token',
+            flow_direction_asset_prefixes='1,2'
+        )
+
+        # act
+        config = Config.from_snapshot(validated_config.dict())
+
+        # assert
+        assert config == validated_config
+        assert config.has_label_prefix('1/a', 'flow_direction_asset_prefixes')
+        assert not config.has_label_prefix('3/a', 'flow_direction_asset_prefixes')
+
+
+class TestLabelPrefixes(unittest.TestCase):
+    def test_has_label_prefix(self):
+        # arrange
+        config = Config(
+            gcs_bucket_name='gcs_bucket_name',
+            symbol_detection_api='symbol_detection_api',
+            symbol_detection_api_bearer_token='symbol_detection_api_bearer_token',
+            flow_direction_asset_prefixes='Equipment/, Piping/Endpoint/Pagination',
+            symbol_label_for_connectors='Piping/Endpoint/Pagination'
+        )
+
+        # assert
+        assert config.get_lowered_label_prefixes_tuple('flow_direction_asset_prefixes') == \
+            ('equipment/', 'piping/endpoint/pagination')
+        assert config.symbol_label_for_connectors == set(['Piping/Endpoint/Pagination'])
+        assert config.has_label_prefix('Equipment/Pump', 'flow_direction_asset_prefixes')
+        assert config.has_label_prefix('Piping/Endpoint/Pagination', 'flow_direction_asset_prefixes')
+        assert not config.has_label_prefix('Instrument/Valve/Gate', 'flow_direction_asset_prefixes')
+        assert config.has_label_prefix('Instrument/Valve/Gate', 'symbol_label_prefixes_to_connect_if_close')
+
+    def test_has_label_prefix_with_many_prefixes(self):
+        # arrange
+        config = Config(
+            gcs_bucket_name='gcs_bucket_name',
+            symbol_detection_api='symbol_detection_api',
+            symbol_detection_api_bearer_token='symbol_detection_api_bearer_token',
+            symbol_label_prefixes_with_text='Equipment/,Instrument/,Piping/Endpoint/Pagination,Piping/Fittings/,A.B,C'
+        )
+
+        # assert
+        assert config.has_label_prefix('Instrument/Valve/Gate', 'symbol_label_prefixes_with_text')
+        assert config.has_label_prefix('A.B/1', 'symbol_label_prefixes_with_text')
+        assert not config.has_label_prefix('AxB', 'symbol_label_prefixes_with_text')
+        assert not config.has_label_prefix('Piping/Pipe', 'symbol_label_prefixes_with_text')
+
+
+class TestGetConfig(unittest.TestCase):
+    def test_returns_same_instance(self):
+        # arrange
+        get_config.cache_clear()
+
+        # act
+        first = get_config()
+        second = get_config()
+
+        # assert
+        self.assertIs(first, second)
+
+    def test_module_config_resolves_through_get_config(self):
+        # act
+        debug = config.debug
+
+        # assert
+        self.assertEqual(debug, get_config().debug)
+
+    def test_creating_a_logger_does_not_load_the_configuration(self):
+        # act
+        with patch('app.config.get_config') as mock_get_config:
+            logger_config.get_logger('test_logger_without_configuration')
+
+        # assert
+        mock_get_config.assert_not_called()
+
+    def test_loading_the_configuration_sets_the_logger_level(self):
+        for debug, expected_level in ((False, logging.INFO), (True, logging.DEBUG)):
+            with self.subTest(debug=debug):
+                # arrange
+                logger = logger_config.get_logger('test_logger_level')
+                get_config.cache_clear()
+
+                # act
+                with patch.dict(os.environ, {'DEBUG': str(debug)}):
+                    get_config()
+
+                # assert
+                self.assertEqual(logger.level, expected_level)
+                self.assertEqual(logger.isEnabledFor(logging.DEBUG), debug)
+                get_config.cache_clear()
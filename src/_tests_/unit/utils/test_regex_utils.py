@@ -1,12 +1,14 @@
 # Copyright (c) Microsoft Corporation.
 # Licensed under the MIT license.
 import os
+import re
 import unittest
 import sys
 import parameterized
 
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
 from app.utils.regex_utils import (
+    compile_prefix_pattern,
     does_string_contain_only_one_number_or_one_fraction,
     does_string_contain_at_least_one_number_and_one_letter,
     is_symbol_text_invalid
@@ -149,3 +151,30 @@ class TestIsSymbolTextInvalid(unittest.TestCase):
 
         # assert
         self.assertEqual(result, False)
+
+
+class TestCompilePrefixPattern(unittest.TestCase):
+    def test_longest_prefix_is_matched(self):
+        # act
+        pattern = compile_prefix_pattern(['A', 'A.B', 'Instrument/'])
+
+        # assert
+        self.assertEqual(pattern.match('A.B/1').group(0), 'A.B')
+        self.assertIsNotNone(pattern.match('Instrument/Valve'))
+        self.assertIsNone(pattern.match('instrument/valve'))
+        self.assertIsNone(pattern.match('xA'))
+
+    def test_flags_are_applied(self):
+        # act
+        pattern = compile_prefix_pattern(['instrument/'], re.IGNORECASE)
+
+        # assert
+        self.assertIsNotNone(pattern.match('Instrument/Valve'))
+
+    def test_no_prefixes_match_no_string(self):
+        # act
+        pattern = compile_prefix_pattern([])
+
+        # assert
+        self.assertIsNone(pattern.match(''))
+        self.assertIsNone(pattern.match('Instrument/Valve'))
@@ -1,7 +1,30 @@
 # Copyright (c) Microsoft Corporation.
 # Licensed under the MIT license.
-from pydantic import BaseSettings, root_validator, validator
-from typing import Union, Optional, Set
+from functools import lru_cache
+import os
+from pydantic import BaseSettings, PrivateAttr, root_validator, validator
+from typing import Dict, FrozenSet, Pattern, Tuple, Union, Optional
+
+from app.utils.regex_utils import compile_prefix_pattern
+import logger_config
+
+# Comma separated list settings that are used for label prefix matching
+_LABEL_PREFIX_FIELDS = (
+    'flow_direction_asset_prefixes',
+    'symbol_label_prefixes_to_connect_if_close',
+    'symbol_label_prefixes_to_include_in_graph_image_output',
+    'symbol_label_prefixes_with_text',
+    'symbol_label_for_connectors',
+)
+
+# detect_dotted_lines -> (line_detection_hough_min_line_length floor, line_detection_hough_max_line_gap default)
+_HOUGH_LINE_PARAMETERS = {
+    True: (None, 10),
+    False: (10, None),
+}
+
+# Prefix sets larger than this are matched with a compiled regex alternation instead of str.startswith
+_LABEL_PREFIX_TUPLE_MAX_SIZE = 4
 
 
 class Config(BaseSettings):
@@ -12,8 +35,8 @@ class Config(BaseSettings):
     detect_dotted_lines: bool = False
     enable_preprocessing_text_detection: bool = True
     enable_thinning_preprocessing_line_detection: bool = True
-    flow_direction_asset_prefixes: Union[str, Set[str]] = \
-        {'Equipment/', 'Piping/Endpoint/Pagination'}
+    flow_direction_asset_prefixes: Union[str, FrozenSet[str]] = \
+        frozenset({'Equipment/', 'Piping/Endpoint/Pagination'})
     graph_distance_threshold_for_lines_pixels: int = 50
     graph_distance_threshold_for_symbols_pixels: int = 5
     graph_distance_threshold_for_text_pixels: int = 5
@@ -35,17 +58,17 @@ class Config(BaseSettings):
     port: int = 8000
     symbol_detection_api: str = str()
     symbol_detection_api_bearer_token: str = str()
-    symbol_label_prefixes_to_connect_if_close: Union[str, Set[str]] = \
-        {'Equipment', 'Instrument/Valve/', 'Piping/Fittings/Mid arrow flow direction', 'Piping/Fittings/Flanged connection'}
-    symbol_label_prefixes_to_include_in_graph_image_output: Union[str, Set[str]] = \
-        {'Equipment/', 'Instrument/Valve/', 'Piping/Endpoint/Pagination'}
-    symbol_label_prefixes_with_text: Union[str, Set[str]] = \
-        {'Equipment/', 'Instrument/', 'Piping/Endpoint/Pagination'}
+    symbol_label_prefixes_to_connect_if_close: Union[str, FrozenSet[str]] = \
+        frozenset({'Equipment', 'Instrument/Valve/', 'Piping/Fittings/Mid arrow flow direction', 'Piping/Fittings/Flanged connection'})
+    symbol_label_prefixes_to_include_in_graph_image_output: Union[str, FrozenSet[str]] = \
+        frozenset({'Equipment/', 'Instrument/Valve/', 'Piping/Endpoint/Pagination'})
+    symbol_label_prefixes_with_text: Union[str, FrozenSet[str]] = \
+        frozenset({'Equipment/', 'Instrument/', 'Piping/Endpoint/Pagination'})
     symbol_overlap_threshold: float = 0.6
     text_detection_area_intersection_ratio_threshold: float = 0.8
     text_detection_distance_threshold: float = 0.01
-    symbol_label_for_connectors: Union[str, Set[str]] = \
-        {'Piping/Endpoint/Pagination'}
+    symbol_label_for_connectors: Union[str, FrozenSet[str]] = \
+        frozenset({'Piping/Endpoint/Pagination'})
     valve_symbol_prefix: str = 'Instrument/Valve/'
     workers_count_for_data_batch: int = 3
 
@@ -79,9 +102,51 @@ class Config(BaseSettings):
     # Note: symbol_detection_api and symbol_detection_api_bearer_token retained above
     # You can add Document AI processor config later; kept out for now for generality.
 
+    # Tuple snapshots of the label prefix sets, so str.startswith can match all prefixes in one call
+    _label_prefixes_tuples: Dict[str, Tuple[str, ...]] = PrivateAttr(default_factory=dict)
+    # Lower-cased snapshots, for the callers that match labels case-insensitively
+    _lowered_label_prefixes_tuples: Dict[str, Tuple[str, ...]] = PrivateAttr(default_factory=dict)
+    # Compiled alternations for the prefix sets too large for the tuple form
+    _label_prefixes_patterns: Dict[str, Pattern] = PrivateAttr(default_factory=dict)
+
+    def __init__(self, **values):
+        super().__init__(**values)
+        self._build_label_prefix_snapshots()
+
+    @classmethod
+    def from_snapshot(cls, data: dict) -> 'Config':
+        '''Creates a configuration from already validated values (e.g. get_config().dict()),
+        skipping the environment scan and the validators.
+
+        :param data: The validated configuration values
+        :type data: dict
+        :return: The configuration
+        :rtype: Config'''
+        snapshot_config = cls.construct(**data)
+        snapshot_config._build_label_prefix_snapshots()
+        return snapshot_config
+
+    def _build_label_prefix_snapshots(self):
+        self._label_prefixes_tuples = {
+            field_name: tuple(sorted(getattr(self, field_name)))
+            for field_name in _LABEL_PREFIX_FIELDS
+        }
+        self._lowered_label_prefixes_tuples = {
+            field_name: tuple(sorted({prefix.lower() for prefix in prefixes}))
+            for field_name, prefixes in self._label_prefixes_tuples.items()
+        }
+        self._label_prefixes_patterns = {
+            field_name: compile_prefix_pattern(prefixes)
+            for field_name, prefixes in self._label_prefixes_tuples.items()
+            if len(prefixes) > _LABEL_PREFIX_TUPLE_MAX_SIZE
+        }
+
     class Config:
-        env_file = '.env'
+        # APP_SKIP_ENV_FILE skips reading .env from disk, e.g. when the environment is fully set by tests
+        env_file = None if os.environ.get('APP_SKIP_ENV_FILE') else '.env'
         env_file_encoding = 'utf-8'
+        # Settings are read-only after load, which also makes Config hashable (e.g. as an lru_cache key)
+        frozen = True
         # Allow case-insensitive env names if you like:
         # env_prefix = ''
 
@@ -107,6 +172,7 @@ class Config(BaseSettings):
         "symbol_label_prefixes_with_text",
         "symbol_label_prefixes_to_include_in_graph_image_output",
         "symbol_label_prefixes_to_connect_if_close",
+        "symbol_label_for_connectors",
         pre=True,
         allow_reuse=True
     )
@@ -114,7 +180,7 @@ class Config(BaseSettings):
         if isinstance(val, str):
             val_arr = val.split(',')
             val_arr = [x.strip() for x in val_arr if x.strip() != '']
-            return set(val_arr)
+            return frozenset(val_arr)
         return val
 
     @root_validator(allow_reuse=True)
@@ -125,41 +191,96 @@ class Config(BaseSettings):
          - Require at least one DB config: cloud_sql_instance_connection_name (Cloud SQL) OR graph_db_connection_string (pyodbc / MSSQL)
          - Keep previous dotted-lines root logic for line Hough parameters
         """
-        # --- Storage check ---
+        # Read every setting once up front; the normalized values are written back at the end
         gcs_bucket = values.get('gcs_bucket_name')
         blob_container = values.get('blob_storage_container_name')
+        cloud_sql_instance = values.get('cloud_sql_instance_connection_name')
+        graph_conn_str = values.get('graph_db_connection_string')
+        graph_db_type = values.get('graph_db_type')
+        detect_dotted = values.get('detect_dotted_lines', False)
+        min_line_length = values.get('line_detection_hough_min_line_length')
+        max_line_gap = values.get('line_detection_hough_max_line_gap')
 
+        # --- Storage check ---
         if not gcs_bucket and (blob_container is None or len(str(blob_container).strip()) == 0):
             # if no storage configured, fail fast — pipeline requires a storage target for outputs
             raise ValueError("Configuration error: either 'gcs_bucket_name' or 'blob_storage_container_name' must be provided")
 
         # --- DB check ---
-        cloud_sql_instance = values.get('cloud_sql_instance_connection_name')
-        graph_conn_str = values.get('graph_db_connection_string')
-
         if (cloud_sql_instance is None or len(str(cloud_sql_instance).strip()) == 0) and (graph_conn_str is None or len(str(graph_conn_str).strip()) == 0):
             raise ValueError("Configuration error: either 'cloud_sql_instance_connection_name' (Cloud SQL) or 'graph_db_connection_string' (MSSQL) must be provided")
 
         # If graph_db_type provided, normalize to lower-case and ensure expected values
-        graph_db_type = values.get('graph_db_type') or 'mssql'
-        graph_db_type = str(graph_db_type).lower()
+        graph_db_type = str(graph_db_type or 'mssql').lower()
         if graph_db_type not in ('mssql', 'postgres', 'mysql'):
             raise ValueError("Unsupported 'graph_db_type'. Supported values: 'mssql', 'postgres', 'mysql'")
-        values['graph_db_type'] = graph_db_type
 
         # --- dotted lines handling (preserve original logic) ---
-        detect_dotted = values.get('detect_dotted_lines', False)
-        if detect_dotted is True:
-            values['line_detection_hough_min_line_length'] = None
-            if values.get('line_detection_hough_max_line_gap') is None:
-                values['line_detection_hough_max_line_gap'] = 10
-        else:
-            if values.get('line_detection_hough_min_line_length') is None or values.get('line_detection_hough_min_line_length') < 10:
-                values['line_detection_hough_min_line_length'] = 10
-            values['line_detection_hough_max_line_gap'] = None
+        # None disables the Hough parameter; otherwise the min line length is floored
+        # at the table value and the max line gap defaults to it
+        min_line_length_floor, max_line_gap_default = _HOUGH_LINE_PARAMETERS[bool(detect_dotted)]
+        min_line_length = min_line_length_floor and max(min_line_length or 0, min_line_length_floor)
+        max_line_gap = max_line_gap_default and (max_line_gap if max_line_gap is not None else max_line_gap_default)
 
+        values['graph_db_type'] = graph_db_type
+        values['line_detection_hough_min_line_length'] = min_line_length
+        values['line_detection_hough_max_line_gap'] = max_line_gap
         return values
 
+    # --- Label prefix helpers ---
+
+    def get_lowered_label_prefixes_tuple(self, field_name: str) -> Tuple[str, ...]:
+        '''Returns the lower-cased label prefixes of the given setting as a tuple, to match
+        lower-cased labels with str.startswith.
+
+        :param field_name: The name of the label prefix setting, e.g. 'flow_direction_asset_prefixes'
+        :type field_name: str
+        :return: The lower-cased label prefixes
+        :rtype: Tuple[str, ...]'''
+        return self._lowered_label_prefixes_tuples[field_name]
+
+    def has_label_prefix(self, label: str, field_name: str) -> bool:
+        '''Checks if the label starts with any of the prefixes of the given setting.
+
+        :param label: The symbol label
+        :type label: str
+        :param field_name: The name of the label prefix setting, e.g. 'flow_direction_asset_prefixes'
+        :type field_name: str
+        :return: True if the label starts with one of the prefixes, False otherwise
+        :rtype: bool'''
+        pattern = self._label_prefixes_patterns.get(field_name)
+        if pattern is not None:
+            return pattern.match(label) is not None
+        return label.startswith(self._label_prefixes_tuples[field_name])
+
+    def is_prefix_to_connect_if_close(self, label: str) -> bool:
+        '''Checks if the label starts with one of the prefixes of symbols to connect if close.'''
+        return self.has_label_prefix(label, 'symbol_label_prefixes_to_connect_if_close')
+
+
+@lru_cache(maxsize=1)
+def get_config() -> Config:
+    '''Returns the process-wide configuration, reading the environment and running the
+    validators on first use only.
+
+    :return: The configuration
+    :rtype: Config'''
+    config = Config()
+    # loggers are created at import, before the configuration is loaded
+    logger_config.set_debug(config.debug)
+    return config
+
+
+class _LazyConfig:
+    '''
+    Module-level stand-in for the configuration that resolves attributes through get_config(),
+    so importing this module does not instantiate Config.
+    '''
+    def __getattr__(self, name: str):
+        # special attributes are looked up by copy, pickle and mock; they do not need the configuration
+        if name.startswith('__'):
+            raise AttributeError(name)
+        return getattr(get_config(), name)
+
 
-# Instantiate configuration
-config = Config()
+config = _LazyConfig()
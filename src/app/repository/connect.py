@@ -27,59 +27,246 @@ How this works (assumptions / expected config fields):
 Notes:
  - If you plan to use Cloud SQL Connector, install: `pip install cloud-sql-python-connector[pg8000,pymysql]`
  - For MSSQL + pyodbc you must have the appropriate ODBC driver installed in the environment and provide a valid connection string.
- - This module returns a DB-API / pyodbc connection object. Close it with `.close()` when done.
+ - Connections are pooled per process. `connect()` returns a proxy to a DB-API / pyodbc connection;
+   close it with `.close()`, or use it as a context manager, to return it to the pool.
 """
 
 import logging
-from typing import Optional
+from dataclasses import dataclass
+from functools import cache, lru_cache
+import queue
+import threading
+import time
+from typing import Callable, Optional
 import os
 
 import logger_config
-from app.config import config
+from app.config import get_config
 
 logger = logger_config.get_logger(__name__)
 
-# Lazy imports for optional dependencies
-_pyodbc = None
-_connector = None
-_ConnectorClass = None
-_IPTypes = None
-
+# Lazy imports for optional dependencies.
+# functools.cache keeps the imported modules; the import system serializes the imports themselves.
+@cache
 def _import_pyodbc():
-    global _pyodbc
-    if _pyodbc is None:
-        try:
-            import pyodbc as pyodbc_lib
-        except Exception as e:
-            raise RuntimeError(
-                "pyodbc is required for MSSQL connections but is not installed or failed to import. "
-                "Install pyodbc and ensure the system ODBC drivers are present."
-            ) from e
-        _pyodbc = pyodbc_lib
-    return _pyodbc
+    try:
+        import pyodbc as pyodbc_lib
+    except Exception as e:
+        raise RuntimeError(
+            "pyodbc is required for MSSQL connections but is not installed or failed to import. "
+            "Install pyodbc and ensure the system ODBC drivers are present."
+        ) from e
+    # Connections are pooled by this module, so the ODBC driver manager pooling is turned off
+    pyodbc_lib.pooling = False
+    return pyodbc_lib
+
 
+@cache
 def _import_connector():
     """
     Lazy-import the Cloud SQL Python Connector classes.
     """
-    global _ConnectorClass, _IPTypes
-    if _ConnectorClass is None:
+    try:
+        from google.cloud.sql.connector import Connector, IPTypes  # type: ignore
+    except Exception as e:
+        raise RuntimeError(
+            "cloud-sql-python-connector is required for Cloud SQL connections but is not installed or failed to import. "
+            "Install it with: pip install cloud-sql-python-connector[pg8000,pymysql]"
+        ) from e
+    return Connector, IPTypes
+
+
+# Reusable connector instance (recommended to keep for app lifetime).
+# Each Connector runs its own background event loop, so creation is guarded by a lock
+# to make sure concurrent first connects share a single instance.
+_connector_instance: Optional["Connector"] = None
+_connector_instance_lock = threading.Lock()
+
+
+def _get_connector_instance():
+    global _connector_instance
+    if _connector_instance is None:
+        with _connector_instance_lock:
+            if _connector_instance is None:
+                ConnectorClass, _ = _import_connector()
+                _connector_instance = ConnectorClass()
+    return _connector_instance
+
+
+@dataclass(frozen=True)
+class _DbConfigSnapshot:
+    """
+    Immutable, pre-normalized copy of the database settings read by connect().
+    """
+    db_type: str
+    instance_connection_name: Optional[str]
+    db_user: Optional[str]
+    db_password: Optional[str]
+    db_name: Optional[str]
+    # Name of the IPTypes member used by the Cloud SQL connector ('PRIVATE' or 'PUBLIC')
+    ip_type_name: str
+    connection_string: Optional[str]
+
+
+@lru_cache(maxsize=1)
+def _db_config_snapshot() -> _DbConfigSnapshot:
+    """
+    Build the database settings snapshot once per process from get_config().
+    """
+    config = get_config()
+    return _DbConfigSnapshot(
+        db_type=(getattr(config, "graph_db_type", None) or "mssql").lower(),
+        instance_connection_name=getattr(config, "cloud_sql_instance_connection_name", None),
+        db_user=getattr(config, "db_user", None),
+        db_password=getattr(config, "db_password", None),
+        db_name=getattr(config, "db_name", None),
+        ip_type_name="PRIVATE" if getattr(config, "use_private_ip", False) else "PUBLIC",
+        connection_string=getattr(config, "graph_db_connection_string", None)
+    )
+
+
+# Pool sizing: pool_size comes from config.workers_count_for_data_batch
+_POOL_MAX_OVERFLOW = 4
+_POOL_RECYCLE_SECONDS = 1800
+# How long connect() waits for a checked-out connection to be returned before giving up
+_POOL_TIMEOUT_SECONDS = 30
+
+
+class _PooledConnection:
+    """
+    Proxy around a DB-API connection checked out from a _ConnectionPool.
+    Calling close(), or leaving a `with` block, hands the connection back to the pool instead of
+    closing it; uncommitted work is rolled back. A proxy dropped without being closed returns its
+    connection when it is garbage collected, so its checkout slot is not lost.
+    """
+
+    def __init__(self, pool: "_ConnectionPool", connection, created_at: float):
+        self._pool = pool
+        self._connection = connection
+        self._created_at = created_at
+        self._released = False
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+    def __enter__(self) -> "_PooledConnection":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __del__(self):
+        # __init__ may not have completed, so the attributes are read without going through __getattr__
+        if self.__dict__.get("_released", True):
+            return
+        logger.warning("Pooled database connection was not closed; returning it to the pool")
+        self.close()
+
+    def close(self):
+        if self._released:
+            return
+        self._released = True
+        self._pool.release(self._connection, self._created_at)
+
+
+class _ConnectionPool:
+    """
+    Minimal thread-safe pool of DB-API connections.
+
+    Keeps up to `pool_size` idle connections, allows `max_overflow` extra connections
+    to be checked out at the same time (further checkouts wait up to `timeout_seconds`
+    and then raise TimeoutError), and replaces idle connections older than `recycle_seconds`.
+    """
+
+    def __init__(self, creator: Callable, pool_size: int, max_overflow: int, recycle_seconds: int,
+                 timeout_seconds: float = _POOL_TIMEOUT_SECONDS):
+        self._creator = creator
+        self._recycle_seconds = recycle_seconds
+        self._timeout_seconds = timeout_seconds
+        self._max_connections = pool_size + max_overflow
+        self._idle = queue.LifoQueue(maxsize=pool_size)
+        self._checkout_slots = threading.BoundedSemaphore(self._max_connections)
+
+    def connect(self) -> _PooledConnection:
+        if not self._checkout_slots.acquire(timeout=self._timeout_seconds):
+            raise TimeoutError(
+                f"All {self._max_connections} pooled database connections are checked out; "
+                f"none was returned within {self._timeout_seconds} seconds"
+            )
         try:
-            from google.cloud.sql.connector import Connector, IPTypes  # type: ignore
+            while True:
+                try:
+                    connection, created_at = self._idle.get_nowait()
+                except queue.Empty:
+                    return _PooledConnection(self, self._creator(), time.monotonic())
+
+                if time.monotonic() - created_at <= self._recycle_seconds:
+                    return _PooledConnection(self, connection, created_at)
+                self._close_quietly(connection)
+        except Exception:
+            self._checkout_slots.release()
+            raise
+
+    def release(self, connection, created_at: float):
+        try:
+            # Reset any transaction left open by the caller before the connection is reused
+            connection.rollback()
+            self._idle.put_nowait((connection, created_at))
+        except Exception:
+            self._close_quietly(connection)
+        finally:
+            self._checkout_slots.release()
+
+    def dispose(self):
+        while True:
+            try:
+                connection, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._close_quietly(connection)
+
+    @staticmethod
+    def _close_quietly(connection):
+        try:
+            connection.close()
         except Exception as e:
-            raise RuntimeError(
-                "cloud-sql-python-connector is required for Cloud SQL connections but is not installed or failed to import. "
-                "Install it with: pip install cloud-sql-python-connector[pg8000,pymysql]"
-            ) from e
-        _ConnectorClass = Connector
-        _IPTypes = IPTypes
-    return _ConnectorClass, _IPTypes
-
-# Reusable connector instance (recommended to keep for app lifetime)
-_connector_instance: Optional["Connector"] = None
+            logger.warning("Failed to close pooled database connection: %s", e)
+
+
+_pool: Optional[_ConnectionPool] = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> _ConnectionPool:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = _ConnectionPool(
+                    _create_connection,
+                    pool_size=max(1, get_config().workers_count_for_data_batch),
+                    max_overflow=_POOL_MAX_OVERFLOW,
+                    recycle_seconds=_POOL_RECYCLE_SECONDS,
+                    timeout_seconds=_POOL_TIMEOUT_SECONDS
+                )
+    return _pool
 
 
 def connect():
+    """
+    Check out a DB connection from the process-wide connection pool.
+
+    Returns:
+        A proxy to a DB-API compliant connection. Calling `.close()` on it, or leaving a `with`
+        block, returns the underlying connection to the pool.
+    Raises:
+        RuntimeError / ValueError on misconfiguration or missing dependencies.
+        TimeoutError if every pooled connection stays checked out for the pool timeout.
+    """
+    return _get_pool().connect()
+
+
+def _create_connection():
     """
     Create and return a DB connection based on configuration.
 
@@ -88,17 +275,16 @@ def connect():
     Raises:
         RuntimeError / ValueError on misconfiguration or missing dependencies.
     """
-    db_type = getattr(config, "graph_db_type", None) or "mssql"
-    db_type = db_type.lower()
-    logger.info(f"Connecting to database (db_type={db_type})...")
+    snapshot = _db_config_snapshot()
+    db_type = snapshot.db_type
+    logger.info("Connecting to database (db_type=%s)...", db_type)
 
     # CLOUD SQL (Postgres / MySQL) via Cloud SQL Python Connector
     if db_type in ("postgres", "mysql"):
-        instance_connection_name = getattr(config, "cloud_sql_instance_connection_name", None)
-        db_user = getattr(config, "db_user", None)
-        db_password = getattr(config, "db_password", None)
-        db_name = getattr(config, "db_name", None)
-        use_private_ip = bool(getattr(config, "use_private_ip", False))
+        instance_connection_name = snapshot.instance_connection_name
+        db_user = snapshot.db_user
+        db_password = snapshot.db_password
+        db_name = snapshot.db_name
 
         if not instance_connection_name:
             raise ValueError(
@@ -110,20 +296,15 @@ def connect():
         if not db_name:
             raise ValueError("config.db_name must be set for Cloud SQL connections.")
 
-        ConnectorClass, IPTypes = _import_connector()
-
-        global _connector_instance
-        if _connector_instance is None:
-            # Keep a single Connector instance per process (recommended)
-            _connector_instance = ConnectorClass()
-
-        ip_type = IPTypes.PRIVATE if use_private_ip else IPTypes.PUBLIC
+        _, IPTypes = _import_connector()
+        connector = _get_connector_instance()
+        ip_type = getattr(IPTypes, snapshot.ip_type_name)
 
         if db_type == "postgres":
             # Use pg8000 (pure Python) to avoid system deps on psycopg2
             driver = "pg8000"
             try:
-                conn = _connector_instance.connect(
+                conn = connector.connect(
                     instance_connection_name,
                     driver,
                     user=db_user,
@@ -132,7 +313,7 @@ def connect():
                     ip_type=ip_type
                 )
             except Exception as e:
-                logger.error(f"Failed to create Postgres connection via Cloud SQL Connector: {e}")
+                logger.error("Failed to create Postgres connection via Cloud SQL Connector: %s", e)
                 raise
             return conn
 
@@ -140,7 +321,7 @@ def connect():
             # Use pymysql driver
             driver = "pymysql"
             try:
-                conn = _connector_instance.connect(
+                conn = connector.connect(
                     instance_connection_name,
                     driver,
                     user=db_user,
@@ -149,13 +330,13 @@ def connect():
                     ip_type=ip_type
                 )
             except Exception as e:
-                logger.error(f"Failed to create MySQL connection via Cloud SQL Connector: {e}")
+                logger.error("Failed to create MySQL connection via Cloud SQL Connector: %s", e)
                 raise
             return conn
 
     # MSSQL / SQL Server via pyodbc
     elif db_type in ("mssql", "sqlserver", "sql_server"):
-        connection_string = getattr(config, "graph_db_connection_string", None)
+        connection_string = snapshot.connection_string
         if not connection_string:
             raise ValueError(
                 "For MSSQL connections please set 'graph_db_connection_string' in config. "
@@ -169,7 +350,7 @@ def connect():
             logger.info("Connected to MSSQL database")
             return cnxn
         except Exception as e:
-            logger.error(f"Failed to connect to MSSQL via pyodbc: {e}")
+            logger.error("Failed to connect to MSSQL via pyodbc: %s", e)
             raise
 
     else:
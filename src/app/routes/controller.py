@@ -5,7 +5,8 @@ from fastapi import FastAPI, Depends
 from fastapi_health import health
 from app.routes.controllers.pid_digitization_controller import router as pid_digitalization_router
 from app.services.symbol_detection.symbol_detection_endpoint_client import symbol_detection_endpoint_client
-from app.services.blob_storage_client import blob_storage_client
+from app.services.blob_storage_client import get_blob_storage_client
+from app.services.text_detection.utils.ocr_client import get_ocr_client
 import logger_config
 from app.routes.tracing_middleware import TracingMiddleware
 
@@ -39,13 +40,15 @@ def is_dependency_online(startup_status: bool = Depends(symbol_detection_endpoin
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    blob_storage_client.init()
+    get_blob_storage_client()
+    # the lifespan runs in every server worker, so each worker opens its own Vision channel before serving requests
+    get_ocr_client().warm_up()
     yield
     return
 
 
 app = FastAPI(lifespan=lifespan)
-app.add_middleware(TracingMiddleware, blob_storage_client=blob_storage_client)
+app.add_middleware(TracingMiddleware)
 app.add_api_route("/health/liveness", health([is_application_live]), include_in_schema=False)
 app.add_api_route("/health/readiness", health([is_application_ready]), include_in_schema=False)
 app.add_api_route("/health/startup", health([is_dependency_online]), include_in_schema=False)
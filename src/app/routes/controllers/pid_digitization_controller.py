@@ -16,7 +16,7 @@ from app.services import (
     graph_construction,
     graph_persistence
 )
-from app.services.blob_storage_client import blob_storage_client
+from app.services.blob_storage_client import get_blob_storage_client
 from app.models.bounding_box import BoundingBox
 from app.models.enums.job_step import JobStep
 from app.models.line_detection.line_detection_response import LineDetectionInferenceResponse
@@ -55,7 +55,7 @@ def _exists_file(
     inference_result_path: str
 ):
     try:
-        file_exists = blob_storage_client.blob_exists(inference_result_path)
+        file_exists = get_blob_storage_client().blob_exists(inference_result_path)
     except Exception as e:
         logger.error(f'Exception while checking if blob exists: {e}')
         raise HTTPException(status_code=500, detail='Internal server error while checking if blob exists.')
@@ -66,7 +66,7 @@ def _download_file(
     inference_result_path: str
 ):
     try:
-        inference_results_bytes = blob_storage_client.download_bytes(inference_result_path)
+        inference_results_bytes = get_blob_storage_client().download_bytes(inference_result_path)
     except Exception as e:
         logger.error(f'Exception while downloading inference results: {e}')
         raise HTTPException(status_code=500, detail='Internal server error while downloading.')
@@ -101,8 +101,8 @@ def _update_job_status(
     dt = datetime.utcnow().isoformat()
     job_status_details = JobStatusDetails(status=status, step=job_step,
                                           message=message, updated_at=dt)
-    blob_storage_client.upload_bytes(job_status_path,
-                                     json.dumps(job_status_details.dict(), default=str))
+    get_blob_storage_client().upload_bytes(job_status_path,
+                                           json.dumps(job_status_details.dict(), default=str))
 
 
 @router.post(
@@ -343,7 +343,7 @@ def process_line_detection(pid_id: str, text_detection_results: GraphConstructio
         line_detection_response_path = storage_path_template_builder.build_inference_response_path(pid_id,
                                                                                                    InferenceResult.graph_construction,
                                                                                                    InferenceResult.line_detection.value)
-        blob_storage_client.upload_bytes(line_detection_response_path, json.dumps(line_detection_response.dict()))
+        get_blob_storage_client().upload_bytes(line_detection_response_path, json.dumps(line_detection_response.dict()))
 
         logger.info(f"Line detection job for pid id {pid_id} completed successfully")
         _update_job_status(pid_id, JobStep.line_detection, JobStatus.done)
@@ -388,7 +388,7 @@ def process_graph_construction(
         arrows_line_source_response_path = storage_path_template_builder.build_inference_response_path(pid_id,
                                                                                                        InferenceResult.graph_construction,
                                                                                                        'arrows_line_source')
-        blob_storage_client.upload_bytes(arrows_line_source_response_path, json.dumps(arrow_nodes))
+        get_blob_storage_client().upload_bytes(arrows_line_source_response_path, json.dumps(arrow_nodes))
 
         graph_construction_response = GraphConstructionInferenceResponse(
             image_url=text_detection_results.image_url,
@@ -399,7 +399,7 @@ def process_graph_construction(
             pid_id,
             InferenceResult.graph_construction,
             InferenceResult.graph_construction.value)
-        blob_storage_client.upload_bytes(graph_construction_response_path, json.dumps(graph_construction_response.dict()))
+        get_blob_storage_client().upload_bytes(graph_construction_response_path, json.dumps(graph_construction_response.dict()))
 
         logger.info(f"Graph construction job for pid id {pid_id} completed successfully")
         _update_job_status(pid_id, JobStep.graph_construction, JobStatus.done)
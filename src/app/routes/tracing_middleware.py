@@ -1,10 +1,11 @@
 # Copyright (c) Microsoft Corporation.
 # Licensed under the MIT license.
+from typing import Optional
 from fastapi import FastAPI, HTTPException, Request, Response, UploadFile
 from starlette.types import Message
 from starlette.middleware.base import BaseHTTPMiddleware
 import logger_config
-from app.services.blob_storage_client import BlobStorageClient
+from app.services.blob_storage_client import BlobStorageClient, get_blob_storage_client
 from app.models.enums.inference_result import InferenceResult
 from app.services import storage_path_template_builder
 
@@ -15,10 +16,19 @@ class TracingMiddleware(BaseHTTPMiddleware):
     '''
     This class is used to log the requests and responses of the API.
     '''
-    def __init__(self, app: FastAPI, blob_storage_client: BlobStorageClient):
+    def __init__(self, app: FastAPI, blob_storage_client: Optional[BlobStorageClient] = None):
         super().__init__(app)
         self.enable_storing_data = True
-        self.blob_storage_client = blob_storage_client
+        self._blob_storage_client = blob_storage_client
+
+    @property
+    def blob_storage_client(self) -> BlobStorageClient:
+        '''
+        The client given on construction, or the shared client resolved on first use.
+        '''
+        if self._blob_storage_client is None:
+            self._blob_storage_client = get_blob_storage_client()
+        return self._blob_storage_client
 
     async def set_body(self, request: Request, body: bytes):
         async def receive() -> Message:
@@ -1,5 +1,7 @@
 # Copyright (c) Microsoft Corporation.
 # Licensed under the MIT license.
+from functools import cache
+
 import cv2
 
 
@@ -9,3 +11,26 @@ def to_grayscale(image):
 
 def to_binary(image):
     return cv2.threshold(image, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)[1]
+
+
+@cache
+def is_cuda_available() -> bool:
+    '''Returns whether OpenCV was built with CUDA support and sees at least one CUDA device.'''
+    cuda = getattr(cv2, 'cuda', None)
+    if cuda is None or not hasattr(cuda, 'createCLAHE'):
+        return False
+    try:
+        return cuda.getCudaEnabledDeviceCount() > 0
+    except cv2.error:
+        return False
+
+
+def apply_clahe(image, clip_limit: float = 2.0, tile_grid_size: tuple = (8, 8)):
+    '''Equalizes the contrast of a grayscale image with CLAHE.
+    Runs on the GPU when OpenCV has CUDA support, otherwise in place on the CPU.'''
+    if is_cuda_available():
+        gpu_image = cv2.cuda_GpuMat()
+        gpu_image.upload(image)
+        clahe = cv2.cuda.createCLAHE(clipLimit=clip_limit, tileGridSize=tile_grid_size)
+        return clahe.apply(gpu_image, cv2.cuda.Stream_Null()).download()
+    return cv2.createCLAHE(clipLimit=clip_limit, tileGridSize=tile_grid_size).apply(image, dst=image)
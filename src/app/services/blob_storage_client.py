@@ -1,96 +1,303 @@
 
-from app.config import Config, config
-from typing import Optional, Union, Any
+from app.config import Config, get_config
+import base64
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from functools import cache
+import io
+import mimetypes
+import threading
+import time
+from typing import TYPE_CHECKING, BinaryIO, Dict, Iterable, Optional, Union, Any
 from logger_config import get_logger
 
-import google.auth
-from google.cloud import storage
-from google.api_core.exceptions import NotFound
+import google_crc32c
+from requests.adapters import HTTPAdapter, Retry
+
+if TYPE_CHECKING:
+    from google.cloud import storage
 
 logger = get_logger(__name__)
 
 
+# Lazy imports: google.cloud.storage and google.auth pull in a large dependency tree,
+# so they are only loaded once a client is initialized
+@cache
+def _import_storage():
+    """
+    Lazy-import google.cloud.storage and google.api_core.exceptions (NotFound, GoogleAPIError, ...).
+    """
+    from google.cloud import storage
+    # loads the storage.retry submodule, which upload_bytes() uses for DEFAULT_RETRY
+    import google.cloud.storage.retry  # noqa: F401
+    from google.api_core import exceptions
+    return storage, exceptions
+
+
+@cache
+def _import_google_auth():
+    """
+    Lazy-import google.auth together with its credentials module and requests transport.
+    """
+    import google.auth
+    import google.auth.credentials
+    import google.auth.transport.requests
+    return google.auth
+
+
+# Maximum number of object names whose existence is remembered by blob_exists()
+EXISTS_CACHE_MAX_SIZE = 8192
+# How long an existing object is remembered as existing; bounds staleness when other processes delete it.
+# Missing objects are not remembered, as they are typically about to be written (e.g. polled job outputs)
+EXISTS_CACHE_TTL_SECONDS = 60
+
+# HTTP connection pool of the storage client: at least this many connections,
+# or HTTP_POOL_CONNECTIONS_PER_WORKER per data batch worker if that is larger
+HTTP_POOL_MIN_SIZE = 32
+HTTP_POOL_CONNECTIONS_PER_WORKER = 4
+HTTP_MOUNT_PREFIXES = ['https://', 'http://']
+
+# Uploads larger than the multipart limit are sent as resumable uploads in chunks of this size
+# (must be a multiple of 256 KiB), so a transient error only resends the current chunk
+UPLOAD_CHUNK_SIZE_BYTES = 8 * 1024 * 1024
+# Binary uploads at least this large are skipped when the object already holds the same content.
+# Checking costs a metadata request, which only pays off when it can save a large upload
+UNCHANGED_UPLOAD_CHECK_MIN_BYTES = 1024 * 1024
+
+# Access tokens are refreshed in the background this long before they expire.
+# A failed refresh is retried after CREDENTIALS_REFRESH_RETRY_SECONDS, doubling up to
+# CREDENTIALS_REFRESH_MAX_RETRY_SECONDS, and given up after CREDENTIALS_REFRESH_MAX_FAILURES
+# consecutive failures, leaving the refresh to the storage library on the next request
+CREDENTIALS_REFRESH_MARGIN_SECONDS = 300
+CREDENTIALS_REFRESH_RETRY_SECONDS = 60
+CREDENTIALS_REFRESH_MAX_RETRY_SECONDS = 960
+CREDENTIALS_REFRESH_MAX_FAILURES = 5
+
+
+def _crc32c_base64(data: bytes) -> str:
+    """
+    Returns the CRC32C checksum of the data, base64 encoded the way GCS reports it in Blob.crc32c.
+    """
+    return base64.b64encode(google_crc32c.value(data).to_bytes(4, 'big')).decode('utf-8')
+
+
 class BlobStorageClient:
     """
     GCP-backed replacement for the Azure BlobStorageClient.
     Public API preserved: init(), upload_bytes(), download_bytes(), blob_exists().
+    Additionally: download_to() to stream into a caller buffer and download_many() for concurrent downloads.
 
     Mapping:
       - Azure container -> GCS bucket
       - Azure blob -> GCS object
     """
 
-    _bucket: Optional[storage.Bucket] = None
-    _client: Optional[storage.Client] = None
+    _bucket: Optional["storage.Bucket"] = None
+    _client: Optional["storage.Client"] = None
 
-    def __init__(self, config: Config = config, credential: Optional[Any] = None):
+    def __init__(self, config: Optional[Config] = None, credential: Optional[Any] = None):
         """
         :param config: configuration object. Expected keys:
                        - gcs_bucket_name (preferred)
                        - OR blob_storage_container_name (falls back to this for compatibility)
                        - optionally: gcp_project
+                       If None, the shared configuration from get_config() is resolved on init().
         :param credential: optional google.auth credentials object.
                            If None, Application Default Credentials (ADC) are used.
         """
         self._config = config
         self._credential = credential
+        self._exists_cache: OrderedDict = OrderedDict()
+        self._exists_cache_lock = threading.Lock()
+        self._credentials_refresh_timer: Optional[threading.Timer] = None
 
     def throw_if_not_initialized(self):
         """Throws an exception if the storage client is not initialized."""
         if self._bucket is None or self._client is None:
             raise Exception('Blob storage client is not initialized')
 
-    def upload_bytes(self, blob_name: str, image_bytes: Union[bytes, str]):
+    def _is_cached_as_existing(self, blob_name: str) -> bool:
+        """Returns whether the object was recently seen to exist."""
+        with self._exists_cache_lock:
+            expires_at = self._exists_cache.get(blob_name)
+            if expires_at is None:
+                return False
+            if time.monotonic() >= expires_at:
+                del self._exists_cache[blob_name]
+                return False
+            self._exists_cache.move_to_end(blob_name)
+            return True
+
+    def _cache_exists(self, blob_name: str):
+        expires_at = time.monotonic() + EXISTS_CACHE_TTL_SECONDS
+        with self._exists_cache_lock:
+            self._exists_cache[blob_name] = expires_at
+            self._exists_cache.move_to_end(blob_name)
+            if len(self._exists_cache) > EXISTS_CACHE_MAX_SIZE:
+                self._exists_cache.popitem(last=False)
+
+    def invalidate(self, blob_name: str):
+        """
+        Forgets the remembered existence of the given object, e.g. after it was deleted.
+
+        :param blob_name: the object name
+        """
+        with self._exists_cache_lock:
+            self._exists_cache.pop(blob_name, None)
+
+    def upload_bytes(self, blob_name: str, image_bytes: Union[bytes, str], content_type: Optional[str] = None):
         """
         Uploads the given bytes/string to the configured GCS bucket.
 
         :param blob_name: destination object name in the bucket
         :param image_bytes: bytes or string to upload
+        :param content_type: optional content type of the object; guessed from the object name if None
         :return: the google.cloud.storage.Blob instance
         """
-        logger.info(f'Uploading {blob_name} to GCS bucket')
+        logger.info('Uploading %s to GCS bucket', blob_name)
 
         self.throw_if_not_initialized()
         blob = self._bucket.blob(blob_name)
 
-        # upload_from_string handles both bytes and text
-        if isinstance(image_bytes, (bytes, bytearray)):
-            blob.upload_from_string(image_bytes)
+        # Text is uploaded utf-8 encoded
+        is_binary = isinstance(image_bytes, (bytes, bytearray))
+        if is_binary:
+            data = bytes(image_bytes)
         else:
-            blob.upload_from_string(str(image_bytes))
+            data = str(image_bytes).encode('utf-8')
+
+        storage, api_exceptions = _import_storage()
+
+        # Skip large uploads when the object already holds identical content (e.g. pipeline re-runs).
+        # Text documents such as the job status change on every write, so they are always uploaded
+        if is_binary and len(data) >= UNCHANGED_UPLOAD_CHECK_MIN_BYTES:
+            try:
+                blob.reload(client=self._client)
+            except api_exceptions.NotFound:
+                pass
+            else:
+                if blob.crc32c == _crc32c_base64(data):
+                    logger.info('Skipping upload of %s, content is unchanged', blob_name)
+                    self._cache_exists(blob_name)
+                    return blob
+
+        blob.chunk_size = UPLOAD_CHUNK_SIZE_BYTES
+        content_type = content_type or mimetypes.guess_type(blob_name)[0] or 'application/octet-stream'
+        try:
+            # The payload is deterministic, so retrying the (otherwise non-idempotent) upload is safe
+            blob.upload_from_file(
+                io.BytesIO(data),
+                size=len(data),
+                content_type=content_type,
+                checksum='crc32c',
+                retry=storage.retry.DEFAULT_RETRY)
+        except api_exceptions.GoogleAPIError as e:
+            logger.error('Failed to upload %s to GCS bucket: %s', blob_name, e)
+            raise
+
+        self._cache_exists(blob_name)
 
         # Returning the blob keeps return type flexible like Azure client did.
         return blob
 
+    def delete_blob(self, blob_name: str):
+        """
+        Deletes the given object from the GCS bucket. A missing object is ignored.
+
+        :param blob_name: the object name
+        """
+        logger.info('Deleting %s from GCS bucket', blob_name)
+
+        self.throw_if_not_initialized()
+        _, api_exceptions = _import_storage()
+        try:
+            self._bucket.blob(blob_name).delete(client=self._client)
+        except api_exceptions.NotFound:
+            pass
+        finally:
+            self.invalidate(blob_name)
+
     def download_bytes(self, blob_name: str) -> bytes:
         """
         Downloads the given object from the GCS bucket and returns bytes.
 
         :param blob_name: the object name
         :return: bytes of the object
+        :raises FileNotFoundError: if the object does not exist
         """
-        logger.info(f'Downloading {blob_name} from GCS bucket')
+        buffer = io.BytesIO()
+        self.download_to(blob_name, buffer)
+        return buffer.getvalue()
+
+    def download_to(self, blob_name: str, destination: BinaryIO):
+        """
+        Streams the given object from the GCS bucket into a caller-provided writable binary buffer,
+        e.g. a BytesIO that can then be viewed with getbuffer() without another copy.
+
+        :param blob_name: the object name
+        :param destination: the buffer to write the object bytes to
+        :raises FileNotFoundError: if the object does not exist
+        """
+        logger.info('Downloading %s from GCS bucket', blob_name)
 
         self.throw_if_not_initialized()
         blob = self._bucket.blob(blob_name)
+        _, api_exceptions = _import_storage()
 
-        if not blob.exists(client=self._client):
+        # No exists() pre-check: a missing object surfaces as NotFound, which saves a request per download
+        try:
+            blob.download_to_file(destination, client=self._client)
+        except api_exceptions.NotFound:
             raise FileNotFoundError(f"GCS object '{blob_name}' not found in bucket '{self._bucket.name}'")
 
-        return blob.download_as_bytes()
+    def download_many(self, blob_names: Iterable[str]) -> Dict[str, bytes]:
+        """
+        Downloads the given objects concurrently, so the request round trips overlap.
+
+        :param blob_names: the object names
+        :return: dict mapping each object name to its bytes
+        :raises FileNotFoundError: if any of the objects does not exist
+        """
+        self.throw_if_not_initialized()
+        blob_names = list(dict.fromkeys(blob_names))
+        if not blob_names:
+            return {}
+
+        max_workers = min(len(blob_names), self._config.workers_count_for_data_batch * HTTP_POOL_CONNECTIONS_PER_WORKER)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return dict(zip(blob_names, executor.map(self.download_bytes, blob_names)))
 
     def blob_exists(self, blob_name: str) -> bool:
         """
         Checks if the given object exists in the GCS bucket.
+        Objects seen to exist (or uploaded by this client) are remembered for EXISTS_CACHE_TTL_SECONDS,
+        so repeated checks skip the request. Missing objects are always checked again.
 
         :param blob_name: the object name to check
         :return: True if exists, False otherwise
         """
-        logger.info(f'Checking if {blob_name} exists in GCS bucket')
+        logger.info('Checking if %s exists in GCS bucket', blob_name)
 
         self.throw_if_not_initialized()
+        if self._is_cached_as_existing(blob_name):
+            return True
+
         blob = self._bucket.blob(blob_name)
-        return blob.exists(client=self._client)
+        exists = blob.exists(client=self._client)
+        if exists:
+            self._cache_exists(blob_name)
+        return exists
+
+    def get_uri(self, blob_name: str) -> str:
+        """
+        Returns the gs:// URI of the given object, for services that read it directly from GCS.
+
+        :param blob_name: the object name
+        :return: the gs://<bucket>/<object> URI
+        """
+        self.throw_if_not_initialized()
+        return f'gs://{self._bucket.name}/{blob_name}'
 
     def init(self):
         """
@@ -102,6 +309,9 @@ class BlobStorageClient:
 
         Optionally uses config.gcp_project or falls back to ADC project.
         """
+        if self._config is None:
+            self._config = get_config()
+
         # Resolve bucket name (support old config key for easier migration)
         bucket_name = getattr(self._config, "gcs_bucket_name", None) or \
                       getattr(self._config, "blob_storage_container_name", None)
@@ -112,24 +322,90 @@ class BlobStorageClient:
         creds = self._credential
         project = getattr(self._config, "gcp_project", None)
 
+        storage, api_exceptions = _import_storage()
+        google_auth = _import_google_auth()
+
         if creds is None:
-            creds, adc_project = google.auth.default()
+            creds, adc_project = google_auth.default()
             if project is None:
                 project = adc_project
 
+        # Fetch the access token now rather than on the first upload/download, and keep it fresh.
+        # Anonymous credentials have no token to refresh
+        if not isinstance(creds, google_auth.credentials.AnonymousCredentials):
+            self._refresh_credentials(creds)
+
         # Create storage client (project optional)
         if project:
             self._client = storage.Client(project=project, credentials=creds)
         else:
             self._client = storage.Client(credentials=creds)
 
+        self._configure_http_pool()
+
         try:
             # get_bucket will raise NotFound if missing
             self._bucket = self._client.get_bucket(bucket_name)
-        except NotFound:
+        except api_exceptions.NotFound:
             raise FileNotFoundError(f"Bucket '{bucket_name}' not found in project '{project}'")
 
+    def _refresh_credentials(self, creds, failures: int = 0):
+        """
+        Refreshes the access token of the credentials and schedules the next refresh shortly before it expires,
+        so requests do not block on a token fetch. Credentials without an expiry are not refreshed again.
+        """
+        try:
+            creds.refresh(_import_google_auth().transport.requests.Request())
+        except Exception as e:
+            failures += 1
+            if failures >= CREDENTIALS_REFRESH_MAX_FAILURES:
+                logger.warning('Failed to refresh GCS credentials %s times, giving up: %s', failures, e)
+                return
+            delay_seconds = min(CREDENTIALS_REFRESH_RETRY_SECONDS * 2 ** (failures - 1), CREDENTIALS_REFRESH_MAX_RETRY_SECONDS)
+            logger.warning('Failed to refresh GCS credentials, retrying in %ss: %s', delay_seconds, e)
+            self._schedule_credentials_refresh(creds, delay_seconds, failures)
+            return
+
+        expiry = getattr(creds, 'expiry', None)
+        if isinstance(expiry, datetime):
+            # google-auth reports expiry as a naive UTC datetime
+            seconds_to_expiry = (expiry - datetime.utcnow()).total_seconds()
+            self._schedule_credentials_refresh(
+                creds,
+                max(seconds_to_expiry - CREDENTIALS_REFRESH_MARGIN_SECONDS, CREDENTIALS_REFRESH_RETRY_SECONDS))
+
+    def _schedule_credentials_refresh(self, creds, delay_seconds: float, failures: int = 0):
+        if self._credentials_refresh_timer is not None:
+            self._credentials_refresh_timer.cancel()
+        timer = threading.Timer(delay_seconds, self._refresh_credentials, args=(creds, failures))
+        timer.daemon = True
+        timer.start()
+        self._credentials_refresh_timer = timer
+
+    def _configure_http_pool(self):
+        """
+        Replaces the default HTTP adapters of the storage client session (10 pooled connections)
+        with adapters sized for the parallel data batch workers.
+        Only connection errors are retried here; the storage library retries failed responses itself.
+        """
+        workers_count = getattr(self._config, "workers_count_for_data_batch", 1) or 1
+        pool_size = max(HTTP_POOL_MIN_SIZE, workers_count * HTTP_POOL_CONNECTIONS_PER_WORKER)
+        retries = Retry(connect=5, read=0, status=0, other=0, backoff_factor=0.3)
 
-# Default instance pattern (similar to original)
-blob_storage_client = BlobStorageClient(config)
-# NOTE: call blob_storage_client.init() during app startup after config/env are ready.
+        session = self._client._http
+        for mount_prefix in HTTP_MOUNT_PREFIXES:
+            session.mount(
+                mount_prefix,
+                HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retries))
+
+
+@cache
+def get_blob_storage_client() -> BlobStorageClient:
+    """
+    Returns the shared, initialized BlobStorageClient of the process.
+    The client is created and initialized on first use, so importing this module does not
+    load the configuration or connect to GCS.
+    """
+    blob_storage_client = BlobStorageClient(get_config())
+    blob_storage_client.init()
+    return blob_storage_client
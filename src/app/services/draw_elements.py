@@ -5,7 +5,7 @@ import numpy as np
 from app.models.bounding_box import BoundingBox
 from app.models.image_details import ImageDetails
 from app.utils.image_utils import denormalize_coordinates
-from typing import Optional
+from typing import Optional, Union
 from app.models.line_detection.line_segment import LineSegment
 
 
@@ -88,7 +88,7 @@ def draw_line(
 
 
 def draw_bounding_boxes(
-    image_bytes: bytes,
+    image_bytes: Union[bytes, np.ndarray],
     image_details: ImageDetails,
     ids: Optional[list[int]],
     bounding_boxes: list[BoundingBox],
@@ -97,8 +97,8 @@ def draw_bounding_boxes(
 ) -> cv2.Mat:
     '''Draws the bounding boxes on the image.
 
-    :param image_bytes: The image bytes.
-    :type image_bytes: bytes
+    :param image_bytes: The image bytes, or an already decoded image which is drawn on in place.
+    :type image_bytes: Union[bytes, np.ndarray]
     :param image_details: The image details.
     :type image_details: ImageDetails
     :param bounding_boxes: The bounding boxes.
@@ -124,7 +124,10 @@ def draw_bounding_boxes(
         raise ValueError('The number of valid bit arrays must match the number of bounding boxes.')
 
     # convert the bytes to a cv2 image
-    image = cv2.imdecode(np.frombuffer(image_bytes, np.uint8), cv2.IMREAD_COLOR)
+    if isinstance(image_bytes, (bytes, bytearray)):
+        image = cv2.imdecode(np.frombuffer(image_bytes, np.uint8), cv2.IMREAD_COLOR)
+    else:
+        image = image_bytes
     for id, bounding_box, label, valid_bit in zip(ids, bounding_boxes, annotations, valid_bit_array):
         draw_annotation_on_image(
             id,
@@ -48,8 +48,8 @@ def connect_symbols_that_are_close(
                 continue
 
             # Filter out symbols that are not in the mapping
-            if symbol1.label.startswith(tuple(config.symbol_label_prefixes_to_connect_if_close)) and \
-               symbol2.label.startswith(tuple(config.symbol_label_prefixes_to_connect_if_close)):
+            if config.is_prefix_to_connect_if_close(symbol1.label) and \
+               config.is_prefix_to_connect_if_close(symbol2.label):
                 connect(graph, symbol1, symbol2, graph_symbol_to_symbol_distance_threshold)
 
     return graph
@@ -24,20 +24,20 @@ def draw_persistent_graph_networkx(
         Shows the output graph
         :param connectivites: Connectivities
     """
-    symbol_label_prefixes_to_include = {prefix.lower() for prefix in symbol_label_prefixes_to_include}
+    symbol_label_prefixes_to_include = tuple({prefix.lower() for prefix in symbol_label_prefixes_to_include})
     g = nx.DiGraph()
     # Only add assets to this graph view if they are in the set of symbol label prefixes to include
     for asset in assets:
-        if asset.label.lower().startswith(tuple(symbol_label_prefixes_to_include)):
+        if asset.label.lower().startswith(symbol_label_prefixes_to_include):
             g.add_node(asset.id, **asset.dict())
 
     # Only add edges between assets if they are in the set of symbol label prefixes to include
     # Only include edges where FlowDirection is unknown or downstream - this ensures that we don't
     # include upstream connections as those should already be captured in the graph.
     for asset in assets:
-        if asset.label.lower().startswith(tuple(symbol_label_prefixes_to_include)):
+        if asset.label.lower().startswith(symbol_label_prefixes_to_include):
             for connected_asset in asset.connections:
-                if connected_asset.label.lower().startswith(tuple(symbol_label_prefixes_to_include)) \
+                if connected_asset.label.lower().startswith(symbol_label_prefixes_to_include) \
                   and (connected_asset.flow_direction == FlowDirection.unknown or
                        connected_asset.flow_direction == FlowDirection.downstream):
                     g.add_edge(asset.id, connected_asset.id)
@@ -6,6 +6,7 @@ from app.models.graph_construction.pre_find_symbol_connectivities_response impor
 from app.models.graph_construction.traversal_connection import TraversalConnection
 import logger_config
 import time
+from typing import Union
 
 logger = logger_config.get_logger(__name__)
 
@@ -14,7 +15,7 @@ def find_symbol_connectivities(
     graph_service: GraphService,
     pre_find_symbol_connectivities: PreFindSymbolConnectivitiesResponse,
     propagation_should_use_exhaustive_search: bool = False,
-    arrow_symbol_label: str = config.arrow_symbol_label,
+    arrow_symbol_label: Union[str, None] = None,
 ):
     '''This function finds all symbols that are connected to each other, and returns a graph
     that represents the connections between symbols.
@@ -29,6 +30,8 @@ def find_symbol_connectivities(
     :type arrow_symbol_label: str
     :return: The connected symbols
     :rtype: dict[str, list[TraversalConnection]]]'''
+    if arrow_symbol_label is None:
+        arrow_symbol_label = config.arrow_symbol_label
 
     logger.debug('Beginning propagation...')
     tic = time.perf_counter()
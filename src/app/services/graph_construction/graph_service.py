@@ -88,7 +88,7 @@ class GraphService:
                 nodes.append((node_id, node))
         return nodes
 
-    def get_arrow_symbols_at_T_junction(self, arrow_symbol_label: str = config.arrow_symbol_label):
+    def get_arrow_symbols_at_T_junction(self, arrow_symbol_label: Union[str, None] = None):
         '''Gets the arrow symbols with high degree
 
         :param arrow_symbol_label: The label of the arrow symbol
@@ -96,6 +96,9 @@ class GraphService:
         :return: The arrow symbols with high degree
         :rtype: list
         '''
+        if arrow_symbol_label is None:
+            arrow_symbol_label = config.arrow_symbol_label
+
         degree_criteria = 2
         nodes = self.G.nodes(data=True)
 
@@ -167,7 +170,7 @@ class GraphService:
         exhaust_paths: bool = False,
         propagation_pass: bool = False,
         junction_arrow_ids: Union[set[str], None] = None,
-        arrow_symbol_label: str = config.arrow_symbol_label
+        arrow_symbol_label: Union[str, None] = None
     ) -> list[TraversalConnection]:
         '''Traverses the graph from the starting node
 
@@ -186,6 +189,9 @@ class GraphService:
         :return: The list of connected objects with flow direction
         :rtype: list[TraversalConnection]
         '''
+        if arrow_symbol_label is None:
+            arrow_symbol_label = config.arrow_symbol_label
+
         queue = []
         queue.append(TraversalConnection(node_id=starting_node, flow_direction=FlowDirection.unknown))
         visited = {starting_node}
@@ -7,14 +7,15 @@ from app.services.graph_construction.graph_service import GraphService
 from app.utils.regex_utils import (
      does_string_contain_at_least_one_number_and_one_letter,
      is_symbol_text_invalid)
+from typing import Union
 
 
 def pre_find_symbol_connectivities(
     graph_service: GraphService,
-    arrow_symbol_label: str = config.arrow_symbol_label,
-    flow_direction_asset_prefixes: set[str] = config.flow_direction_asset_prefixes,
-    valve_symbol_prefix: str = config.valve_symbol_prefix,
-    symbol_label_prefixes_with_text: set[str] = config.symbol_label_prefixes_with_text
+    arrow_symbol_label: Union[str, None] = None,
+    flow_direction_asset_prefixes: Union[set[str], None] = None,
+    valve_symbol_prefix: Union[str, None] = None,
+    symbol_label_prefixes_with_text: Union[set[str], None] = None
 ):
     '''This function generates the necessary data for the find symbol connectivities function.
 
@@ -29,11 +30,28 @@ def pre_find_symbol_connectivities(
     :return: The pre find symbol connectivities response
     :rtype: PreFindSymbolConnectivitiesResponse
     '''
-    symbol_label_prefixes_with_text_lowered_tuple = \
-        tuple([prefix.lower() for prefix in symbol_label_prefixes_with_text])
+    # the defaults are read here so that importing this module does not load the configuration
+    if arrow_symbol_label is None:
+        arrow_symbol_label = config.arrow_symbol_label
+    if valve_symbol_prefix is None:
+        valve_symbol_prefix = config.valve_symbol_prefix
 
-    flow_direction_asset_prefixes_lowered_tuple = \
-        tuple([prefix.lower() for prefix in flow_direction_asset_prefixes])
+    # the configured prefixes are lowered once, when the configuration is loaded
+    if symbol_label_prefixes_with_text is None:
+        symbol_label_prefixes_with_text_lowered_tuple = \
+            config.get_lowered_label_prefixes_tuple('symbol_label_prefixes_with_text')
+    else:
+        symbol_label_prefixes_with_text_lowered_tuple = \
+            tuple([prefix.lower() for prefix in symbol_label_prefixes_with_text])
+
+    if flow_direction_asset_prefixes is None:
+        flow_direction_asset_prefixes_lowered_tuple = \
+            config.get_lowered_label_prefixes_tuple('flow_direction_asset_prefixes')
+    else:
+        flow_direction_asset_prefixes_lowered_tuple = \
+            tuple([prefix.lower() for prefix in flow_direction_asset_prefixes])
+
+    valve_symbol_prefix_lowered = valve_symbol_prefix.lower()
     symbol_nodes = graph_service.get_symbol_nodes()
 
     asset_symbol_ids: set[str] = set()
@@ -46,19 +64,21 @@ def pre_find_symbol_connectivities(
                 symbol_node[SymbolNodeKeysConfig.TEXT_ASSOCIATED_KEY] is None:
             continue
 
+        symbol_label_lowered = symbol_label.lower()
+
         # get all the flow direction asset symbols
-        if symbol_label.lower().startswith(flow_direction_asset_prefixes_lowered_tuple):
+        if symbol_label_lowered.startswith(flow_direction_asset_prefixes_lowered_tuple):
             flow_direction_asset_ids.add(symbol_node_id)
 
         # get all the asset symbols - valid alpha-numeric sensors, valves, equipments and pagination
         symbol_text = symbol_node[SymbolNodeKeysConfig.TEXT_ASSOCIATED_KEY]
         if does_string_contain_at_least_one_number_and_one_letter(symbol_text) and \
                 is_symbol_text_invalid(symbol_text) is False and \
-                symbol_label.lower().startswith(symbol_label_prefixes_with_text_lowered_tuple):
+                symbol_label_lowered.startswith(symbol_label_prefixes_with_text_lowered_tuple):
             asset_symbol_ids.add(symbol_node_id)
 
             # get all the valve symbols
-            if symbol_label.lower().startswith(valve_symbol_prefix.lower()):
+            if symbol_label_lowered.startswith(valve_symbol_prefix_lowered):
                 asset_valve_symbol_ids.add(symbol_node_id)
 
     response = PreFindSymbolConnectivitiesResponse(
@@ -116,9 +116,9 @@ if __name__ == "__main__":
     import argparse
     import os
     import json
-    from app.services.blob_storage_client import blob_storage_client
+    from app.services.blob_storage_client import get_blob_storage_client
 
-    blob_storage_client.init()
+    get_blob_storage_client()
 
     parser = argparse.ArgumentParser(
         description='Run line segment detection on the given image.')
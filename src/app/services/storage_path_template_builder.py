@@ -81,3 +81,17 @@ def build_output_image_path(pid_id: str, inference_result: InferenceResult, post
     :type inference_result: InferenceResult
     '''
     return f'{pid_id}/{inference_result}/output_{pid_id}_{postfix}.png'
+
+
+def build_ocr_image_path(pid_id: str, inference_result: InferenceResult, extension: str) -> str:
+    '''Builds the storage path of the image staged for OCR when it is too large to send inline.
+
+    :param pid_id: The pid id of the request.
+    :type pid_id: str
+    :param inference_result: The inference result type.
+    :type inference_result: InferenceResult
+    :param extension: The file extension of the image encoding, without the dot.
+    :type extension: str
+    :return: The OCR image storage path.
+    :rtype: str'''
+    return f'{pid_id}/{inference_result}/ocr_{pid_id}.{extension}'
@@ -87,7 +87,10 @@ async def run_inferencing(
 
     logger.debug('Drawing bounding boxes on image')
     ids: list[int] = [label.id for label in inference_results.label]
-    bounding_boxes: list[BoundingBox] = [BoundingBox(**label.dict()) for label in inference_results.label]
+    bounding_boxes: list[BoundingBox] = [
+        BoundingBox.construct(topX=label.topX, topY=label.topY, bottomX=label.bottomX, bottomY=label.bottomY)
+        for label in inference_results.label
+    ]
 
     labels: list[str | None] = []
     for label in inference_results.label:
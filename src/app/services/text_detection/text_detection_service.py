@@ -3,16 +3,25 @@ from app.models.text_detection.text_detection_inference_response import TextDete
 from app.models.text_detection.text_recognized import TextRecognized
 from app.models.symbol_detection.symbol_detection_inference_response import SymbolDetectionInferenceResponse
 from app.models.bounding_box import BoundingBox
+from app.models.enums.inference_result import InferenceResult
+from app.services import storage_path_template_builder
+from app.services.blob_storage_client import get_blob_storage_client
 from app.services.draw_elements import draw_bounding_boxes
 from app.services.text_detection.symbol_to_text_correlation_service import correlate_symbols_with_text
+from app.services.text_detection.utils.ocr_client import get_ocr_client
 from app.services.text_detection.utils.text_detection_image_preprocessor import TextDetectionImagePreprocessor
-from app.utils.image_utils import normalize_coordinates
 from app.utils.regex_utils import (
+    compile_prefix_pattern,
     does_string_contain_at_least_one_number_and_one_letter,
     does_string_contain_only_one_number_or_one_fraction)
+from concurrent.futures import Future, ThreadPoolExecutor
 import cv2
 from fastapi import HTTPException
-import io
+from functools import lru_cache
+import numpy as np
+import re
+import sys
+import threading
 from logger_config import get_logger
 from typing import Optional, List, Tuple, Union
 
@@ -20,22 +29,38 @@ from app.config import config
 
 logger = get_logger(__name__)
 
-# Attempt to import Google Vision client (used for OCR on GCP).
-# If not present, raise an informative error when invoked.
-try:
-    from google.cloud import vision
-    from google.api_core.exceptions import GoogleAPIError
-except Exception:
-    vision = None
-    GoogleAPIError = Exception  # fallback
+# Images at least this large are re-encoded as lossy WebP before being sent to Vision
+OCR_IMAGE_COMPRESSION_MIN_BYTES = 500 * 1024
+OCR_IMAGE_WEBP_QUALITY = 90
+# Larger images are staged in Cloud Storage and read by Vision from there instead of being sent inline
+OCR_INLINE_IMAGE_MAX_BYTES = 6_000_000
+# File signatures of the image encodings sent to Vision, with the extension and content type of the staged image
+_OCR_IMAGE_FORMATS = (
+    (b'\x89PNG', 'png', 'image/png'),
+    (b'\xff\xd8\xff', 'jpg', 'image/jpeg'),
+    (b'GIF8', 'gif', 'image/gif'),
+    (b'BM', 'bmp', 'image/bmp'),
+    (b'II*\x00', 'tiff', 'image/tiff'),
+    (b'MM\x00*', 'tiff', 'image/tiff'),
+)
+# The output images are encoded and uploaded on a thread pool, so they are written concurrently.
+# Each pending write holds a full page image, so at most OUTPUT_IMAGE_WRITER_MAX_PENDING writes are
+# queued or running at a time; further writes wait for a free slot
+OUTPUT_IMAGE_WRITER_MAX_WORKERS = 4
+OUTPUT_IMAGE_WRITER_MAX_PENDING = 8
+OUTPUT_IMAGE_PNG_PARAMS = [cv2.IMWRITE_PNG_COMPRESSION, 3]
+
+_IO_POOL = ThreadPoolExecutor(max_workers=OUTPUT_IMAGE_WRITER_MAX_WORKERS)
+_PENDING_IMAGE_WRITES = threading.BoundedSemaphore(OUTPUT_IMAGE_WRITER_MAX_PENDING)
 
 
 def _convert_text_detection_to_text_details(
     text_detection_results: List[Tuple[str, List[Tuple[int, int]]]],
     image_height: int,
     image_width: int
-):
+) -> List[TextRecognized]:
     '''Converts the text detection results to text details.
+    The bounding boxes of all results are reduced and normalized in a single NumPy pass.
 
     :param text_detection_results: The text detection results (list of (text, bounding_box))
                                    where bounding_box is a list of 4 (x,y) tuples in pixels.
@@ -44,111 +69,181 @@ def _convert_text_detection_to_text_details(
     :param image_width: The width of the image.
     :type image_width: int
     :return: The text details.
-    :rtype: Generator[TextRecognized, None, None]
+    :rtype: List[TextRecognized]
     '''
-    for text_detection_result in text_detection_results:
-        text = text_detection_result[0]
-        bounding_box = text_detection_result[1]
-        # bounding_box expected as [(x1,y1),(x2,y2),(x3,y3),(x4,y4)]
-        if len(bounding_box) < 4:
-            # defensively create a rectangle bounding box if returned polygon is degenerate
-            xs = [p[0] for p in bounding_box]
-            ys = [p[1] for p in bounding_box]
-            top_x = min(xs) if xs else 0
-            top_y = min(ys) if ys else 0
-            bottom_x = max(xs) if xs else 0
-            bottom_y = max(ys) if ys else 0
-        else:
-            x1, y1 = bounding_box[0]
-            x2, y2 = bounding_box[1]
-            x3, y3 = bounding_box[2]
-            x4, y4 = bounding_box[3]
-            top_x = min(x1, x2, x3, x4)
-            top_y = min(y1, y2, y3, y4)
-            bottom_x = max(x1, x2, x3, x4)
-            bottom_y = max(y1, y2, y3, y4)
-
-        top_x, top_y, bottom_x, bottom_y = normalize_coordinates(
-            top_x,
-            top_y,
-            bottom_x,
-            bottom_y,
-            image_height,
-            image_width
-        )
-        yield TextRecognized(
+    if not text_detection_results:
+        return []
+
+    texts = [text_detection_result[0] for text_detection_result in text_detection_results]
+    bounding_boxes = [text_detection_result[1] for text_detection_result in text_detection_results]
+    # (N, 4, 2) array of polygon vertices; the OCR client returns 4 vertices per box, so this is
+    # normally a single conversion without a Python-level pass over the boxes
+    try:
+        points = np.asarray(bounding_boxes, dtype=np.int32)
+    except ValueError:
+        points = None
+    if points is None or points.shape[1:] != (4, 2):
+        # degenerate polygons are padded with their last vertex (or a zero vertex),
+        # which leaves their enclosing rectangle unchanged
+        points = np.asarray([_pad_bounding_box(bounding_box) for bounding_box in bounding_boxes], dtype=np.int32)
+
+    image_size = np.array([image_width, image_height], dtype=np.float64)
+    top_left = (points.min(axis=1) / image_size).tolist()
+    bottom_right = (points.max(axis=1) / image_size).tolist()
+
+    # the values are plain floats and OCR strings already, so the models are built without validation
+    return [
+        TextRecognized.construct(
             text=text,
             topX=top_x,
             topY=top_y,
             bottomX=bottom_x,
             bottomY=bottom_y
         )
+        for text, (top_x, top_y), (bottom_x, bottom_y) in zip(texts, top_left, bottom_right)
+    ]
 
 
-def _read_text_with_google_vision(image_bytes: bytes) -> List[Tuple[str, List[Tuple[int, int]]]]:
-    """
-    Run OCR using Google Cloud Vision API and return a list of tuples:
-      [(text, [(x1,y1),(x2,y2),(x3,y3),(x4,y4)]), ...]
+def _pad_bounding_box(bounding_box: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    '''Returns the first 4 vertices of the bounding box, padding shorter polygons by repeating their last vertex.
+
+    :param bounding_box: The bounding polygon in pixels.
+    :type bounding_box: List[Tuple[int, int]]
+    :return: Exactly 4 vertices.
+    :rtype: List[Tuple[int, int]]
+    '''
+    if len(bounding_box) >= 4:
+        return bounding_box[:4]
+    if not bounding_box:
+        return [(0, 0)] * 4
+    return list(bounding_box) + [bounding_box[-1]] * (4 - len(bounding_box))
+
+
+def _encode_image_for_ocr(image_bytes: bytes) -> bytes:
+    '''Re-encodes a large image as WebP to reduce the bytes uploaded to Vision.
+    The pixel dimensions are unchanged, so the returned bounding boxes still match the original image.
+    Small images, images that cannot be decoded and images that do not get smaller are returned as is.
+
+    :param image_bytes: The encoded image.
+    :type image_bytes: bytes
+    :return: The image to send to Vision.
+    :rtype: bytes
+    '''
+    if len(image_bytes) < OCR_IMAGE_COMPRESSION_MIN_BYTES:
+        return image_bytes
+
+    # decoding to 8-bit color keeps 16-bit and alpha images, which WebP cannot hold, away from the encoder
+    image = cv2.imdecode(np.frombuffer(image_bytes, np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        return image_bytes
+
+    success, buffer = cv2.imencode('.webp', image, [cv2.IMWRITE_WEBP_QUALITY, OCR_IMAGE_WEBP_QUALITY])
+    if not success or buffer.nbytes >= len(image_bytes):
+        return image_bytes
+
+    return buffer.tobytes()
+
+
+def _encode_image_array_for_ocr(image: np.ndarray, source_image_size: int) -> bytes:
+    '''Encodes a decoded image, e.g. the preprocessed image, for Vision in a single pass:
+    8-bit images from a source of at least OCR_IMAGE_COMPRESSION_MIN_BYTES as WebP, anything else as PNG.
+
+    :param image: The decoded image.
+    :type image: np.ndarray
+    :param source_image_size: The size of the encoded image the array was decoded from.
+    :type source_image_size: int
+    :return: The image to send to Vision.
+    :rtype: bytes
+    '''
+    if source_image_size >= OCR_IMAGE_COMPRESSION_MIN_BYTES and image.dtype == np.uint8:
+        success, buffer = cv2.imencode('.webp', image, [cv2.IMWRITE_WEBP_QUALITY, OCR_IMAGE_WEBP_QUALITY])
+        if success:
+            return buffer.tobytes()
+
+    return cv2.imencode('.png', image)[1].tobytes()
+
+
+def _get_image_format(image_bytes: bytes) -> Tuple[str, str]:
+    '''Detects the encoding of the image from its file signature.
+
+    :param image_bytes: The encoded image.
+    :type image_bytes: bytes
+    :return: The file extension and content type of the encoding; ('bin', 'application/octet-stream') if unknown.
+    :rtype: Tuple[str, str]'''
+    if image_bytes[:4] == b'RIFF' and image_bytes[8:12] == b'WEBP':
+        return 'webp', 'image/webp'
+    for signature, extension, content_type in _OCR_IMAGE_FORMATS:
+        if image_bytes.startswith(signature):
+            return extension, content_type
+    return 'bin', 'application/octet-stream'
 
-    Each bounding polygon is returned in absolute pixel coordinates (if Vision provides them).
-    If Vision returns fewer than 4 vertices for an annotation, a rectangle bbox is constructed
-    using min/max of available vertices.
-    """
-    if vision is None:
-        raise RuntimeError(
-            "google.cloud.vision is not available. Install google-cloud-vision and ensure "
-            "Application Default Credentials are configured (set GOOGLE_APPLICATION_CREDENTIALS or use GCP runtime)."
-        )
 
-    client = vision.ImageAnnotatorClient()
+def _read_text(pid_id: str, image_bytes: bytes) -> List[Tuple[str, List[Tuple[int, int]]]]:
+    '''Runs OCR on the image. Images larger than OCR_INLINE_IMAGE_MAX_BYTES are uploaded to the
+    P&ID's text detection folder and passed to Vision by URI, since inline requests are size limited.
+    The staged image is deleted once Vision has read it.
 
-    image = vision.Image(content=image_bytes)
+    :param pid_id: The pid id.
+    :type pid_id: str
+    :param image_bytes: The image to read.
+    :type image_bytes: bytes
+    :return: The text detection results as (text, bounding_box) pairs.
+    :rtype: List[Tuple[str, List[Tuple[int, int]]]]'''
+    if len(image_bytes) <= OCR_INLINE_IMAGE_MAX_BYTES:
+        return get_ocr_client().read_text(image_bytes)
+
+    blob_storage_client = get_blob_storage_client()
+    extension, content_type = _get_image_format(image_bytes)
+    ocr_image_path = storage_path_template_builder.build_ocr_image_path(pid_id, InferenceResult.text_detection, extension)
+    blob_storage_client.upload_bytes(ocr_image_path, image_bytes, content_type=content_type)
     try:
-        response = client.text_detection(image=image)
-    except GoogleAPIError as e:
-        logger.error(f"Google Vision API error: {e}")
+        return get_ocr_client().read_text_uri(blob_storage_client.get_uri(ocr_image_path))
+    finally:
+        try:
+            blob_storage_client.delete_blob(ocr_image_path)
+        except Exception as e:
+            logger.warning(f'Could not delete the image staged for OCR {ocr_image_path}: {e}')
+
+
+@lru_cache(maxsize=8)
+def _compile_label_prefix_pattern(lowered_prefixes: Tuple[str, ...]) -> re.Pattern:
+    '''Compiles a case-insensitive pattern matching labels that start with any of the prefixes.
+    Longer prefixes are tried first; an empty prefix set matches no label.
+
+    :param lowered_prefixes: The lowered label prefixes.
+    :type lowered_prefixes: Tuple[str, ...]
+    :return: The compiled pattern, to be used with match().
+    :rtype: re.Pattern'''
+    return compile_prefix_pattern(lowered_prefixes, re.IGNORECASE)
+
+
+def _on_image_written(future: Future):
+    _PENDING_IMAGE_WRITES.release()
+    exception = future.exception()
+    if exception is not None:
+        logger.error(f"Error saving text detection output images: {exception}")
+
+
+def _write_image_in_background(path: str, image: cv2.Mat) -> Future:
+    '''Encodes and writes the image on the I/O thread pool, waiting for a free slot when
+    OUTPUT_IMAGE_WRITER_MAX_PENDING writes are already pending.
+    Errors are logged, as they were when the images were written in the request thread.
+
+    :param path: The path to write the image to.
+    :type path: str
+    :param image: The image to write.
+    :type image: cv2.Mat
+    :return: The future of the write.
+    :rtype: Future
+    '''
+    _PENDING_IMAGE_WRITES.acquire()
+    try:
+        future = _IO_POOL.submit(cv2.imwrite, path, image, OUTPUT_IMAGE_PNG_PARAMS)
+    except Exception:
+        _PENDING_IMAGE_WRITES.release()
         raise
-
-    if response.error.message:
-        # If there's an error message from the API, raise so calling code can handle it.
-        logger.error(f"Google Vision returned an error: {response.error.message}")
-        raise RuntimeError(f"Google Vision error: {response.error.message}")
-
-    results: List[Tuple[str, List[Tuple[int, int]]]] = []
-
-    # response.text_annotations: first element is the full text, subsequent elements are individual detections
-    annotations = response.text_annotations
-    if not annotations:
-        return results
-
-    # Skip the first (full-text), iterate over individual text annotations
-    for ann in annotations[1:]:
-        text = ann.description or ""
-        # bounding polygon
-        vertices = []
-        if ann.bounding_poly and ann.bounding_poly.vertices:
-            for v in ann.bounding_poly.vertices:
-                # Some vertices may omit x or y; default to 0 if missing
-                vx = int(v.x) if hasattr(v, "x") and v.x is not None else 0
-                vy = int(v.y) if hasattr(v, "y") and v.y is not None else 0
-                vertices.append((vx, vy))
-
-        # If Vision gave a weird polygon (not 4 points), create a rectangle bbox
-        if len(vertices) >= 4:
-            # If more than 4 vertices, take first 4 (typical is 4)
-            bbox = vertices[:4]
-        elif len(vertices) > 0:
-            xs = [p[0] for p in vertices]
-            ys = [p[1] for p in vertices]
-            min_x, min_y, max_x, max_y = min(xs), min(ys), max(xs), max(ys)
-            bbox = [(min_x, min_y), (max_x, min_y), (max_x, max_y), (min_x, max_y)]
-        else:
-            # No polygon info; skip this annotation (or create degenerate 0-box)
-            bbox = [(0, 0), (0, 0), (0, 0), (0, 0)]
-
-        results.append((text, bbox))
-
-    return results
+    future.add_done_callback(_on_image_written)
+    return future
 
 
 def run_inferencing(
@@ -183,17 +278,18 @@ def run_inferencing(
     :rtype: TextDetectionInferenceResponse'''
     logger.info(f"Running inferencing for pid id {pid_id}")
 
-    symbol_label_prefixes_with_text_lowered_tuple: tuple[str] = tuple(sorted([elem.lower() for elem in symbol_label_prefixes_with_text]))
+    symbol_label_prefixes_with_text_lowered_tuple: tuple[str] = tuple(
+        sorted([sys.intern(elem.lower()) for elem in symbol_label_prefixes_with_text]))
 
-    image_byte_stream = io.BytesIO(image)
+    # the preprocessed image is encoded for Vision straight from the array, without a PNG round trip
     if (config.enable_preprocessing_text_detection):
-        preprocessed_image = TextDetectionImagePreprocessor.preprocess(image)
-        image_byte_stream = io.BytesIO(preprocessed_image)
+        image_for_ocr = _encode_image_array_for_ocr(TextDetectionImagePreprocessor.preprocess_image(image), len(image))
+    else:
+        image_for_ocr = _encode_image_for_ocr(image)
 
     try:
-        # Use Google Vision OCR for text detection on GCP
-        # It returns [(text, [(x1,y1),(x2,y2),(x3,y3),(x4,y4)]), ...]
-        text_detection_inference_results = _read_text_with_google_vision(image_byte_stream.getvalue())
+        # Google Vision OCR returns [(text, [(x1,y1),(x2,y2),(x3,y3),(x4,y4)]), ...]
+        text_detection_inference_results = _read_text(pid_id, image_for_ocr)
     except Exception as e:
         logger.error(f'There was an error performing OCR on the image: {e}')
         raise HTTPException(status_code=500, detail='There was an internal issue performing OCR on the image.')
@@ -203,7 +299,6 @@ def run_inferencing(
         symbol_detection_inference_results.image_details.height,
         symbol_detection_inference_results.image_details.width
     )
-    text_details = list(text_details)
     text_and_symbols_associated_list = correlate_symbols_with_text(
         text_details,
         symbol_detection_inference_results,
@@ -222,57 +317,66 @@ def run_inferencing(
 
     logger.info(f"Saving images for pid id {pid_id}")
     # drawing text and symbol associated information image
-    pruned_text_and_symbols_associated_list = []
+    # symbols with text are pruned and their drawing inputs collected in a single pass
+    ids: list[int] = []
+    bounding_boxes: list[BoundingBox] = []
+    labels: list[str] = []
+    valid_bit_array: list[int] = []
+
+    is_one_number_or_one_fraction = does_string_contain_only_one_number_or_one_fraction
+    match_label_prefix_with_text = _compile_label_prefix_pattern(symbol_label_prefixes_with_text_lowered_tuple).match
+    has_number_and_letter = does_string_contain_at_least_one_number_and_one_letter
 
     for result in text_and_symbols_associated_list:
-        if result.text_associated is None or \
-           does_string_contain_only_one_number_or_one_fraction(result.text_associated):
+        text_associated = result.text_associated
+        if text_associated is None or is_one_number_or_one_fraction(text_associated):
             continue
 
-        if result.label.lower().startswith(symbol_label_prefixes_with_text_lowered_tuple):
-            pruned_text_and_symbols_associated_list.append(result)
+        if match_label_prefix_with_text(result.label) is None:
+            continue
+
+        ids.append(result.id)
+        # the results are already validated models, so the boxes are built without dict() and re-validation
+        bounding_boxes.append(
+            BoundingBox.construct(topX=result.topX, topY=result.topY, bottomX=result.bottomX, bottomY=result.bottomY))
+        labels.append(text_associated)
+        valid_bit_array.append(1 if has_number_and_letter(text_associated) else 0)
+
+    draw_debug_text_image = config.debug and debug_image_text_path
+
+    # the image is decoded once; boxes are drawn in place, so the second drawing gets a copy
+    decoded_image = cv2.imdecode(np.frombuffer(image, np.uint8), cv2.IMREAD_COLOR)
+    symbol_with_text_image = decoded_image.copy() if draw_debug_text_image and decoded_image is not None else decoded_image
 
-    ids: list[int] = [
-        result.id for result in pruned_text_and_symbols_associated_list
-    ]
-    bounding_boxes: list[BoundingBox] = [
-        BoundingBox(**result.dict()) for result in pruned_text_and_symbols_associated_list
-    ]
-    labels = [
-        result.text_associated for result in pruned_text_and_symbols_associated_list
-    ]
-    valid_bit_array = [
-        1 if does_string_contain_at_least_one_number_and_one_letter(result.text_associated or '') else 0
-        for result in pruned_text_and_symbols_associated_list
-    ]
     debug_symbol_with_text_image = draw_bounding_boxes(
-        image,
+        symbol_with_text_image,
         symbol_detection_inference_results.image_details,
         ids,
         bounding_boxes,
         labels,
         valid_bit_array)
 
-    if (config.debug and debug_image_text_path):
-        bounding_boxes: list[BoundingBox] = [
-            BoundingBox(**result.dict()) for result in text_details
-        ]
+    if draw_debug_text_image:
         labels = [result.text if result.text else '' for result in text_details]
+        # TextRecognized is a BoundingBox, so the text details are drawn as they are
         debug_text_image = draw_bounding_boxes(
-            image,
+            decoded_image,
             symbol_detection_inference_results.image_details,
             None,
-            bounding_boxes,
+            text_details,
             labels
         )
 
-    try:
-        if output_image_symbol_and_text_path:
-            cv2.imwrite(output_image_symbol_and_text_path, debug_symbol_with_text_image)
-        if (config.debug and debug_image_text_path):
-            cv2.imwrite(debug_image_text_path, debug_text_image)
-    except Exception as e:
-        logger.error(f"Error saving text detection output images: {e}")
+    output_image_write = None
+    if output_image_symbol_and_text_path:
+        output_image_write = _write_image_in_background(output_image_symbol_and_text_path, debug_symbol_with_text_image)
+    if draw_debug_text_image:
+        _write_image_in_background(debug_image_text_path, debug_text_image)
+
+    # The output image is served by the API once this request returns, so it has to be written by then;
+    # only the debug image is left to finish in the background. Write errors are logged by the callback
+    if output_image_write is not None:
+        output_image_write.exception()
 
     return inference_response
 
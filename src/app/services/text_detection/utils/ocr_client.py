@@ -5,13 +5,20 @@
 OCR Client adapted for GCP.
 
 Replaces Azure Form Recognizer with Google Cloud Vision OCR.
-Keeps same public API: `ocr_client.read_text(image_stream)` returning
+Keeps same public API: `get_ocr_client().read_text(image_stream)` returning
 a list of (text, bounding_box) pairs where bounding_box is 4 (x,y) pixel coords.
+`get_ocr_client().read_text_batch(images)` runs OCR on several images with batched requests.
 """
 
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import cache
+import hashlib
 import io
 import logging
-from typing import List, Tuple, Union
+import sys
+import threading
+from typing import Dict, List, Optional, Tuple, Union
 
 from logger_config import get_logger
 
@@ -30,6 +37,59 @@ except ImportError as e:
     )
 
 
+# Maximum number of images Vision accepts in a single batch_annotate_images request
+VISION_BATCH_MAX_IMAGES = 16
+VISION_API_ENDPOINT = "vision.googleapis.com"
+# gRPC channel options: unlimited message sizes as in the library default channel, plus HTTP/2 keepalive
+# pings so an idle connection to Vision stays open and back-to-back requests skip the TLS handshake
+VISION_GRPC_CHANNEL_OPTIONS = [
+    ("grpc.max_send_message_length", -1),
+    ("grpc.max_receive_message_length", -1),
+    ("grpc.keepalive_time_ms", 30000),
+    ("grpc.keepalive_timeout_ms", 10000),
+    ("grpc.http2.max_pings_without_data", 0),
+    ("grpc.keepalive_permit_without_calls", 1),
+]
+# Maximum number of batch requests in flight at once when more than VISION_BATCH_MAX_IMAGES images are read
+VISION_MAX_CONCURRENT_BATCHES = 4
+# Maximum number of images whose OCR results are remembered, keyed by a hash of the image content
+OCR_RESULTS_CACHE_MAX_SIZE = 256
+
+
+def _parse_text_annotations(response) -> List[Tuple[str, List[Tuple[int, int]]]]:
+    """
+    Convert the text annotations of a Vision AnnotateImageResponse into (text, bounding_box) pairs.
+    """
+    results: List[Tuple[str, List[Tuple[int, int]]]] = []
+
+    # Read the underlying protobuf message instead of going through the proto-plus wrappers,
+    # which convert every field on each access
+    annotations = vision.AnnotateImageResponse.pb(response).text_annotations
+    if not annotations:
+        return results
+
+    # Skip the first (full-text annotation)
+    for ann in annotations[1:]:
+        # Diagrams repeat the same short texts (tag prefixes, sizes), so equal texts share one string object
+        text = sys.intern(ann.description)
+        # Unset protobuf coordinates read as 0
+        vertices = [(v.x, v.y) for v in ann.bounding_poly.vertices]
+
+        # Normalize bbox to 4 points
+        if len(vertices) >= 4:
+            bbox = vertices[:4]
+        elif len(vertices) > 0:
+            xs = [p[0] for p in vertices]
+            ys = [p[1] for p in vertices]
+            bbox = [(min(xs), min(ys)), (max(xs), min(ys)), (max(xs), max(ys)), (min(xs), max(ys))]
+        else:
+            bbox = [(0, 0), (0, 0), (0, 0), (0, 0)]
+
+        results.append((text, bbox))
+
+    return results
+
+
 class OCRClient:
     def __init__(self):
         if vision is None:
@@ -38,8 +98,81 @@ class OCRClient:
                 "Install with: pip install google-cloud-vision"
             )
 
-        # Uses Application Default Credentials (GOOGLE_APPLICATION_CREDENTIALS or GCP runtime IAM)
-        self.client = vision.ImageAnnotatorClient()
+        # The Vision client is created on first use, so importing this module does not require credentials
+        self._client = None
+        self._client_lock = threading.Lock()
+        self._results_cache: OrderedDict = OrderedDict()
+        self._results_cache_lock = threading.Lock()
+
+    @property
+    def client(self):
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    # Uses Application Default Credentials (GOOGLE_APPLICATION_CREDENTIALS or GCP runtime IAM).
+                    # gRPC sends the image as a protobuf bytes field; REST would base64 it into JSON.
+                    transport_class = vision.ImageAnnotatorClient.get_transport_class("grpc")
+                    channel = transport_class.create_channel(VISION_API_ENDPOINT, options=VISION_GRPC_CHANNEL_OPTIONS)
+                    self._client = vision.ImageAnnotatorClient(
+                        transport=transport_class(host=VISION_API_ENDPOINT, channel=channel))
+        return self._client
+
+    def warm_up(self):
+        """
+        Create the Vision client and its gRPC channel now rather than on the first OCR request,
+        so the credentials lookup does not delay that request.
+        """
+        self.client
+
+    @staticmethod
+    def _content_key(content: bytes) -> bytes:
+        return hashlib.blake2b(content, digest_size=16).digest()
+
+    def _get_cached_results(self, key: bytes) -> Optional[List[Tuple[str, List[Tuple[int, int]]]]]:
+        """Returns the remembered OCR results of the image, or None if unknown."""
+        with self._results_cache_lock:
+            results = self._results_cache.get(key)
+            if results is None:
+                return None
+            self._results_cache.move_to_end(key)
+            return list(results)
+
+    def _cache_results(self, key: bytes, results: List[Tuple[str, List[Tuple[int, int]]]]):
+        with self._results_cache_lock:
+            self._results_cache[key] = tuple(results)
+            self._results_cache.move_to_end(key)
+            if len(self._results_cache) > OCR_RESULTS_CACHE_MAX_SIZE:
+                self._results_cache.popitem(last=False)
+
+    def _annotate_batch(
+        self,
+        batch: List[Tuple[bytes, bytes]]
+    ) -> List[Tuple[bytes, List[Tuple[str, List[Tuple[int, int]]]]]]:
+        """
+        Send one batch_annotate_images request for the given (key, content) pairs and parse the responses.
+        """
+        images = [vision.Image(content=content) for _, content in batch]
+        return [(key, results) for (key, _), results in zip(batch, self._annotate(images))]
+
+    def _annotate(self, images: list) -> List[List[Tuple[str, List[Tuple[int, int]]]]]:
+        """
+        Send one batch_annotate_images request with text detection for the given Vision images and parse the responses.
+        """
+        features = [vision.Feature(type_=vision.Feature.Type.TEXT_DETECTION)]
+        requests = [vision.AnnotateImageRequest(image=image, features=features) for image in images]
+
+        try:
+            batch_response = self.client.batch_annotate_images(requests=requests)
+        except GoogleAPIError as e:
+            logger.error(f"Vision API error: {e}")
+            raise
+
+        results = []
+        for response in batch_response.responses:
+            if response.error.message:
+                raise RuntimeError(f"Vision API error: {response.error.message}")
+            results.append(_parse_text_annotations(response))
+        return results
 
     def read_text(self, image_stream: Union[bytes, io.BytesIO]) -> List[Tuple[str, List[Tuple[int, int]]]]:
         """
@@ -59,47 +192,77 @@ class OCRClient:
         else:
             raise ValueError("image_stream must be bytes or BytesIO")
 
-        image = vision.Image(content=content)
+        return self.read_text_batch([content])[0]
 
-        try:
-            response = self.client.text_detection(image=image)
-        except GoogleAPIError as e:
-            logger.error(f"Vision API error: {e}")
-            raise
+    def read_text_uri(self, image_uri: str) -> List[Tuple[str, List[Tuple[int, int]]]]:
+        """
+        Run OCR on an image that Vision reads from Cloud Storage.
+        Used for images too large to send inline; results are not cached since the object may change.
 
-        if response.error.message:
-            raise RuntimeError(f"Vision API error: {response.error.message}")
-
-        results: List[Tuple[str, List[Tuple[int, int]]]] = []
-
-        annotations = response.text_annotations
-        if not annotations:
-            return results
-
-        # Skip the first (full-text annotation)
-        for ann in annotations[1:]:
-            text = ann.description or ""
-            vertices = []
-            if ann.bounding_poly and ann.bounding_poly.vertices:
-                for v in ann.bounding_poly.vertices:
-                    vx = int(v.x) if v.x is not None else 0
-                    vy = int(v.y) if v.y is not None else 0
-                    vertices.append((vx, vy))
-
-            # Normalize bbox to 4 points
-            if len(vertices) >= 4:
-                bbox = vertices[:4]
-            elif len(vertices) > 0:
-                xs = [p[0] for p in vertices]
-                ys = [p[1] for p in vertices]
-                bbox = [(min(xs), min(ys)), (max(xs), min(ys)), (max(xs), max(ys)), (min(xs), max(ys))]
-            else:
-                bbox = [(0, 0), (0, 0), (0, 0), (0, 0)]
-
-            results.append((text, bbox))
+        Args:
+            image_uri: gs:// URI of the image.
 
-        return results
+        Returns:
+            List of (text, bounding_box) pairs.
+        """
+        image = vision.Image(source=vision.ImageSource(image_uri=image_uri))
+        return self._annotate([image])[0]
+
+    def read_text_batch(self, images: List[bytes]) -> List[List[Tuple[str, List[Tuple[int, int]]]]]:
+        """
+        Run OCR on several images with batched Vision API requests.
+        Images are sent in batch_annotate_images calls of up to VISION_BATCH_MAX_IMAGES images each,
+        with up to VISION_MAX_CONCURRENT_BATCHES calls in flight so their round trips overlap.
+        Results of recently seen images are served from memory, keyed by a hash of the image content,
+        so identical images are not sent to Vision again.
+
+        Args:
+            images: Image contents as bytes.
+
+        Returns:
+            One list of (text, bounding_box) pairs per image, in the order of the given images.
+        """
+        keys = [self._content_key(content) for content in images]
+        results: List[Optional[List[Tuple[str, List[Tuple[int, int]]]]]] = [self._get_cached_results(key) for key in keys]
+
+        # Images not in the cache, each content sent only once
+        pending: Dict[bytes, bytes] = {}
+        for key, content, result in zip(keys, images, results):
+            if result is None:
+                pending.setdefault(key, content)
+
+        pending_keys = list(pending)
+        batches = [
+            [(key, pending[key]) for key in pending_keys[start:start + VISION_BATCH_MAX_IMAGES]]
+            for start in range(0, len(pending_keys), VISION_BATCH_MAX_IMAGES)
+        ]
+
+        if len(batches) > 1:
+            with ThreadPoolExecutor(max_workers=min(len(batches), VISION_MAX_CONCURRENT_BATCHES)) as executor:
+                batch_results = list(executor.map(self._annotate_batch, batches))
+        else:
+            batch_results = [self._annotate_batch(batch) for batch in batches]
+
+        fetched: Dict[bytes, List[Tuple[str, List[Tuple[int, int]]]]] = {}
+        for batch_result in batch_results:
+            for key, parsed_results in batch_result:
+                fetched[key] = parsed_results
+                self._cache_results(key, parsed_results)
+
+        return [
+            result if result is not None else list(fetched[key])
+            for key, result in zip(keys, results)
+        ]
+
+
+@cache
+def get_ocr_client() -> OCRClient:
+    """Returns the shared OCR client of this process.
 
+    The client is created on first use rather than at import time, so every
+    server worker creates its own client and gRPC channel after it has started.
 
-# Default singleton client
-ocr_client = OCRClient()
+    Returns:
+        OCRClient: The shared OCR client.
+    """
+    return OCRClient()
@@ -1,20 +1,21 @@
 # Copyright (c) Microsoft Corporation.
 # Licensed under the MIT license.
 import cv2
-from app.services import blob_storage_client
+from typing import List, Optional
+from app.services.blob_storage_client import get_blob_storage_client
 
 original_imwrite = cv2.imwrite
 
 
-def blob_imwrite(file_path: str, img: cv2.Mat) -> bool:
-    ret, buffer = cv2.imencode('.png', img)
+def blob_imwrite(file_path: str, img: cv2.Mat, params: Optional[List[int]] = None) -> bool:
+    ret, buffer = cv2.imencode('.png', img, params or [])
 
     tobytes = buffer.tobytes()
 
     if not ret:
         return False
 
-    blob_storage_client.blob_storage_client.upload_bytes(file_path, tobytes)
+    get_blob_storage_client().upload_bytes(file_path, tobytes)
 
     return True
 
@@ -1,6 +1,15 @@
 # Copyright (c) Microsoft Corporation.
 # Licensed under the MIT license.
 import re
+from typing import Iterable
+
+# Patterns are compiled once at import instead of being looked up in the re module cache on every call
+_ONE_NUMBER_OR_ONE_FRACTION = re.compile(r"^[\s]*([0-9]+|[0-9]+/[0-9]+)[\s]*$")
+_AT_LEAST_ONE_NUMBER_AND_ONE_LETTER = re.compile(r"^(?=.*[a-zA-Z])(?=.*[0-9])")
+# invalid expression are things like 3/4"x1/2" or 1" x 2" or 1"x2" or any other combination of numbers, spaces, and quotes
+_MULTIPLY_INCHES = re.compile(r"^([0-9]+|[0-9]+/[0-9]+)[\"|%|*]*[\s]*[xX][\s]*.*([0-9]+|[0-9]+/[0-9]+)[\"|%|*]*.*$")
+# invalid expression are things like 3/4" or 1" or any other combination of numbers and quotes
+_SINGLE_INCHES = re.compile(r"^([0-9]+|[0-9]+/[0-9]+)[\"%*]+$")
 
 
 def does_string_contain_only_one_number_or_one_fraction(string: str):
@@ -11,8 +20,7 @@ def does_string_contain_only_one_number_or_one_fraction(string: str):
     :return: True if the string contains only one number or one fraction, False otherwise
     :rtype: bool
     '''
-    expression = r"^[\s]*([0-9]+|[0-9]+/[0-9]+)[\s]*$"
-    return bool(re.search(expression, string))
+    return _ONE_NUMBER_OR_ONE_FRACTION.match(string) is not None
 
 
 def does_string_contain_at_least_one_number_and_one_letter(string: str):
@@ -23,8 +31,7 @@ def does_string_contain_at_least_one_number_and_one_letter(string: str):
     :return: True if the string contains at least one number and one letter, False otherwise
     :rtype: bool
     '''
-    expression = r"^(?=.*[a-zA-Z])(?=.*[0-9])"
-    return bool(re.search(expression, string))
+    return _AT_LEAST_ONE_NUMBER_AND_ONE_LETTER.match(string) is not None
 
 
 def is_symbol_text_invalid(string: str):
@@ -35,14 +42,21 @@ def is_symbol_text_invalid(string: str):
     :return: True if the string is invalid, False otherwise
     :rtype: bool
     '''
-    # invalid expression are things like 3/4"x1/2" or 1" x 2" or 1"x2" or any other combination of numbers, spaces, and quotes
-    expression_multiply_inches = r"^([0-9]+|[0-9]+/[0-9]+)[\"|%|*]*[\s]*[xX][\s]*.*([0-9]+|[0-9]+/[0-9]+)[\"|%|*]*.*$"
-    if bool(re.search(expression_multiply_inches, string)):
-        return True
+    return _MULTIPLY_INCHES.match(string) is not None or _SINGLE_INCHES.match(string) is not None
+
 
-    # invalid expression are things like 3/4" or 1" or any other combination of numbers and quotes
-    expression_single_inches = r"^([0-9]+|[0-9]+/[0-9]+)[\"%*]+$"
-    if bool(re.search(expression_single_inches, string)):
-        return True
+def compile_prefix_pattern(prefixes: Iterable[str], flags: int = 0) -> re.Pattern:
+    '''Compiles a pattern matching strings that start with any of the prefixes, to be used with match().
+    Longer prefixes are tried first, so the longest matching prefix wins; no prefixes match no string.
 
-    return False
+    :param prefixes: The prefixes to match
+    :type prefixes: Iterable[str]
+    :param flags: The re flags to compile the pattern with, e.g. re.IGNORECASE
+    :type flags: int
+    :return: The compiled pattern
+    :rtype: re.Pattern
+    '''
+    sorted_prefixes = sorted(prefixes, key=len, reverse=True)
+    if not sorted_prefixes:
+        return re.compile(r'(?!)', flags)
+    return re.compile('(?:' + '|'.join(re.escape(prefix) for prefix in sorted_prefixes) + ')', flags)
@@ -4,16 +4,24 @@ import logging
 import ecs_logging
 import sys
 
-from app.config import config
+# Loggers created by get_logger, their level is set once the configuration is loaded
+_loggers = set()
+_level = logging.INFO
+
+
+def set_debug(debug: bool):
+    global _level
+    _level = logging.DEBUG if debug else logging.INFO
+
+    for logger in _loggers:
+        logger.setLevel(_level)
 
 
 def get_logger(logger_name) -> logging.Logger:
     logger = logging.getLogger(logger_name)
 
-    if config.debug:
-        logger.setLevel(logging.DEBUG)
-    else:
-        logger.setLevel(logging.INFO)
+    logger.setLevel(_level)
+    _loggers.add(logger)
 
     if not sys.gettrace():
         # Add an ECS formatter to the Handler